@@ -0,0 +1,210 @@
+import os
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd
+import morale
+from bootstrap import bootstrap_means
+from productivity_stats import HARMONISED_REMOTE_TIME, decode_responses, new_state, state_table, update_state
+from data_io import read_dataset
+
+# =============================
+# READ-ONLY QUERY API
+# =============================
+# Serves the numbers behind the dashboard and the member2 summaries as JSON:
+#
+#   GET /morale?by=work_mode&work_mode=Hybrid&stat=mean       (2020 morale cube)
+#   GET /productivity?by=year,work_mode&year=2021&ci=1        (harmonised 2020+2021)
+#   GET /health
+#
+# Datasets are loaded once and shared by every request thread; they reload
+# when a source file changes. Responses are cached (LRU) per dataset version
+# and normalised query, and carry an ETag derived from both, so clients that
+# send If-None-Match get a 304 without any work being done.
+
+HARMONISED_PATH = os.path.join(morale.BASE_DIR, "datasets", "harmonised_data.csv")
+PRODUCTIVITY_COLUMNS = ["year", HARMONISED_REMOTE_TIME, "relative_remote_productivity"]
+PRODUCTIVITY_DIMENSIONS = ["year", "work_mode"]
+MORALE_STATS = ["mean", "std", "count"]
+CACHE_SIZE = 256
+
+class QueryError(ValueError):
+    pass
+
+_LOCK = threading.Lock()
+# The loaded data: replaced by a new dict on reload and never mutated, so a
+# request that took a reference keeps one consistent version throughout
+_SNAPSHOT = None
+
+def dataset_version():
+    stamps = []
+    for path in (morale.DATA_PATH, HARMONISED_PATH):
+        stat = os.stat(path)
+        stamps.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.sha256("|".join(stamps).encode("utf-8")).hexdigest()[:16]
+
+def _load(version):
+    responses = read_dataset(HARMONISED_PATH, columns=PRODUCTIVITY_COLUMNS)
+    responses = decode_responses(responses, HARMONISED_REMOTE_TIME).dropna()
+    return {
+        "version": version,
+        "cube": morale.get_cube(),
+        "responses": responses,
+        "productivity": update_state(new_state(), responses),
+    }
+
+def current_data():
+    global _SNAPSHOT
+    version = dataset_version()
+    snapshot = _SNAPSHOT
+    if snapshot is None or snapshot["version"] != version:
+        with _LOCK:
+            snapshot = _SNAPSHOT
+            if snapshot is None or snapshot["version"] != version:
+                snapshot = _load(version)
+                _SNAPSHOT = snapshot
+    return snapshot
+
+# =============================
+# QUERIES
+# =============================
+def _one(params, name, default=None, choices=None):
+    values = params.get(name, [default])
+    if len(values) != 1:
+        raise QueryError(f"'{name}' takes a single value")
+    value = values[0]
+    if choices is not None and value not in choices:
+        raise QueryError(f"'{name}' must be one of: {', '.join(choices)}")
+    return value
+
+def _dimensions(params, default, allowed):
+    by = [dim for dim in _one(params, "by", default).split(",") if dim]
+    unknown = [dim for dim in by if dim not in allowed]
+    if not by or unknown:
+        raise QueryError(f"'by' must be a comma-separated subset of: {', '.join(allowed)}")
+    return by
+
+def query_morale(data, params):
+    by = _dimensions(params, "work_mode", morale.CUBE_DIMENSIONS)
+    stat = _one(params, "stat", "mean", MORALE_STATS)
+    work_modes = params.get("work_mode")
+    table = morale.cube_aggregate(data["cube"], by if len(by) > 1 else by[0], work_modes, stat)
+    return table.round(4).reset_index()
+
+def query_productivity(data, params):
+    by = _dimensions(params, "year,work_mode", PRODUCTIVITY_DIMENSIONS)
+    with_ci = _one(params, "ci", "0", ["0", "1"]) == "1"
+    responses = data["responses"]
+    state = data["productivity"]
+    filters = {dim: params[dim] for dim in PRODUCTIVITY_DIMENSIONS if dim in params}
+    if filters:
+        # Filtered tables come from the matching raw rows
+        mask = pd.Series(True, index=responses.index)
+        for dim, values in filters.items():
+            mask &= responses[dim].isin(values)
+        responses = responses[mask]
+        state = update_state(new_state(), responses)
+    table = state_table(state, by)
+    if with_ci:
+        ci = bootstrap_means(responses["prod_score"], [responses[dim] for dim in by])
+        table = table.join(ci[["ci_low", "ci_high"]])
+    return table.round(4).reset_index()
+
+QUERIES = {
+    "/morale": query_morale,
+    "/productivity": query_productivity,
+}
+
+_RESPONSES = OrderedDict()
+_RESPONSES_LOCK = threading.Lock()
+
+def cached_response(data, path, query):
+    # LRU of response bodies keyed by (data version, path, query), each one
+    # computed from the snapshot it is keyed under. query: sorted tuple of
+    # (name, values) so equivalent URLs share an entry.
+    key = (data["version"], path, query)
+    with _RESPONSES_LOCK:
+        if key in _RESPONSES:
+            _RESPONSES.move_to_end(key)
+            return _RESPONSES[key]
+    table = QUERIES[path](data, {name: list(values) for name, values in query})
+    body = {"version": data["version"], "rows": json.loads(table.to_json(orient="records"))}
+    body = json.dumps(body).encode("utf-8")
+    with _RESPONSES_LOCK:
+        _RESPONSES[key] = body
+        while len(_RESPONSES) > CACHE_SIZE:
+            _RESPONSES.popitem(last=False)
+    return body
+
+def etag_for(version, path, query):
+    digest = hashlib.sha256(repr((version, path, query)).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+# =============================
+# HTTP SERVER
+# =============================
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "RemoteWorkAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            return self._send(200, json.dumps({"status": "ok", "version": dataset_version()}).encode("utf-8"))
+        if url.path not in QUERIES:
+            return self._error(404, f"Unknown endpoint {url.path}; try {', '.join(QUERIES)}")
+
+        params = parse_qs(url.query)
+        query = tuple(sorted((name, tuple(values)) for name, values in params.items()))
+        # One snapshot for the whole request: the ETag, the cache key and the
+        # body all describe the same data version
+        data = current_data()
+        etag = etag_for(data["version"], url.path, query)
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            return self._send(304, b"", etag)
+        try:
+            body = cached_response(data, url.path, query)
+        except QueryError as e:
+            return self._error(400, str(e))
+        except Exception as e:
+            # Answer instead of dropping the connection
+            self.log_error("query %s failed: %r", self.path, e)
+            return self._error(500, "Internal error while answering the query")
+        self._send(200, body, etag)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve survey aggregates as a read-only JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    current_data()  # load before accepting connections
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving on http://{args.host}:{args.port} (endpoints: {', '.join(QUERIES)}, /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
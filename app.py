@@ -1,6 +1,13 @@
+import os
+import pandas as pd
 import streamlit as st
 import plotly.express as px
-from morale import get_dataframe, get_summary
+import numpy as np
+from bitmap_index import index_values, select_rows
+from morale import (
+    DATA_PATH, FILTER_COLUMNS, SCATTER_POINT_LIMIT, bin_care_load_vs_age, build_cube,
+    build_filter_index, cube_aggregate, get_dataframe, get_summary_ci,
+)
 
 # PAGE CONFIG
 st.set_page_config(
@@ -11,37 +18,129 @@ st.set_page_config(
 st.title("2020 Remote Work Analytics Dashboard")
 st.markdown("Interactive insights on morale, engagement, and burnout risk")
 
+# Copy-on-write: a session that assigns into a frame derived from the store
+# gets its own copy instead of writing through to the shared data
+pd.set_option("mode.copy_on_write", True)
+
 # LOAD DATA
-df = get_dataframe()
-summary = get_summary()
+# One read-only store per server process, shared by every session. Streamlit
+# serves all sessions from a single process, and cache_resource hands each of
+# them the same objects (cache_data would unpickle a private copy per session
+# and rerun), so memory no longer grows with the number of viewers. Sessions
+# only derive small filtered views from it.
+# The file mtime is part of the key so a re-cleaned dataset is picked up
+# without restarting the server; max_entries drops the superseded store.
+# The aggregate cube answers the summary and the bar/line charts, so filter
+# changes only sum a few dozen cube cells instead of scanning respondents.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_store(data_mtime):
+    df = get_dataframe(copy=False)
+    cube = build_cube(df)
+    return {
+        "df": df,
+        "cube": cube,
+        "summary": cube_aggregate(cube, "work_mode").round(2),
+        "care_load_bins": bin_care_load_vs_age(df),
+        "filter_index": build_filter_index(df),
+    }
+
+# Bootstrap CIs per work mode take most of the cold-start time, so they are
+# kept out of the store and only computed once the summary table is on the
+# page; filters only select rows, and subsets are remembered per combination.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_summary_ci(data_mtime):
+    return get_summary_ci(load_store(data_mtime)["df"])
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def filtered_summary_ci(data_mtime, filter_key):
+    store = load_store(data_mtime)
+    return get_summary_ci(store["df"].iloc[select_rows(store["filter_index"], dict(filter_key))])
+
+# Cube, summary and binned scatter of a cross-filtered subset, remembered per
+# filter combination like the intervals, so reruns with unchanged filters
+# (any other widget) do no per-row work
+@st.cache_data(show_spinner=False, max_entries=64)
+def filtered_view(data_mtime, filter_key):
+    store = load_store(data_mtime)
+    rows = store["df"].iloc[select_rows(store["filter_index"], dict(filter_key))]
+    view_cube = build_cube(rows)
+    return {
+        "rows": len(rows),
+        "cube": view_cube,
+        "summary": cube_aggregate(view_cube, "work_mode").round(2),
+        "care_load_bins": bin_care_load_vs_age(rows),
+    }
+
+data_mtime = os.path.getmtime(DATA_PATH)
+store = load_store(data_mtime)
+df, cube, summary = store["df"], store["cube"], store["summary"]
+care_load_bins, filter_index = store["care_load_bins"], store["filter_index"]
+
+def with_error_bars(frame, metric, ci_table):
+    # Adds the distances from the mean to the 95% CI bounds for plotly's error_y
+    ci = ci_table[metric]
+    frame = frame.merge(ci[["ci_low", "ci_high"]], left_on="work_mode", right_index=True, how="left")
+    frame["ci_plus"] = frame["ci_high"] - frame[metric]
+    frame["ci_minus"] = frame[metric] - frame["ci_low"]
+    return frame
+
+# Above this many respondents chart 4 plots binned cells instead of raw points
+scatter_point_limit = int(os.environ.get("SCATTER_POINT_LIMIT", SCATTER_POINT_LIMIT))
 
 # FILTERS (SIDEBAR)
 st.sidebar.header("🔎 Filters")
 
 work_modes = st.sidebar.multiselect(
     "Select Work Mode",
-    options=df["work_mode"].unique(),
-    default=df["work_mode"].unique()
+    options=summary.index,
+    default=summary.index
+)
+
+# Cross-filters; an empty selection leaves that attribute unconstrained
+attribute_filters = {
+    column: st.sidebar.multiselect(label, options=index_values(filter_index, column))
+    for label, column in FILTER_COLUMNS.items()
+}
+# Values sorted so the same selection made in a different order hits the caches
+filter_key = tuple(
+    (column, tuple(sorted(values, key=str))) for column, values in attribute_filters.items() if values
 )
 
-df = df[df["work_mode"].isin(work_modes)]
+# Work mode is a cube dimension, so it is answered from the shared cube. The
+# other attributes resolve to row positions through the bitmap index, and only
+# those rows are aggregated (once per filter combination).
+if filter_key:
+    view = filtered_view(data_mtime, filter_key)
+    matched, view_cube, view_summary, view_bins = view["rows"], view["cube"], view["summary"], view["care_load_bins"]
+else:
+    matched, view_cube, view_summary, view_bins = len(df), cube, summary, care_load_bins
+st.sidebar.caption(f"{matched:,} of {len(df):,} respondents match the filters")
 
 # SUMMARY
 st.subheader("📋 Executive Summary")
 st.dataframe(
-    summary.loc[work_modes] if len(work_modes) else summary,
+    view_summary[view_summary.index.isin(work_modes)] if len(work_modes) else view_summary,
     width="stretch"
 )
 
+view_ci = filtered_summary_ci(data_mtime, filter_key) if filter_key else load_summary_ci(data_mtime)
+with st.expander("95% bootstrap confidence intervals (10,000 resamples)"):
+    st.dataframe(
+        view_ci[view_ci.index.isin(work_modes)] if len(work_modes) else view_ci,
+        width="stretch"
+    )
+
 st.divider()
 
 # CHART 1: MORALE BY WORK MODE
 st.subheader("📈 Average Morale by Work Mode")
 
 fig1 = px.bar(
-    df.groupby("work_mode", as_index=False)["morale_score"].mean(),
+    with_error_bars(cube_aggregate(view_cube, "work_mode", work_modes).reset_index(), "morale_score", view_ci),
     x="work_mode",
     y="morale_score",
+    error_y="ci_plus",
+    error_y_minus="ci_minus",
     labels={
         "work_mode": "Work Mode",
         "morale_score": "Average Morale Score"
@@ -55,9 +154,11 @@ st.plotly_chart(fig1, use_container_width=True)
 st.subheader("Employee Engagement by Work Mode")
 
 fig2 = px.bar(
-    df.groupby("work_mode", as_index=False)["engagement_score"].mean(),
+    with_error_bars(cube_aggregate(view_cube, "work_mode", work_modes).reset_index(), "engagement_score", view_ci),
     x="work_mode",
     y="engagement_score",
+    error_y="ci_plus",
+    error_y_minus="ci_minus",
     title="Employee Engagement by Work Mode"
 )
 
@@ -69,7 +170,7 @@ st.divider()
 st.subheader("🏢 Organisational Preparedness vs Morale")
 
 fig3 = px.line(
-    df.groupby("org_preparedness_last_year", as_index=False)["morale_score"].mean(),
+    cube_aggregate(view_cube, "org_preparedness_last_year", work_modes).reset_index(),
     x="org_preparedness_last_year",
     y="morale_score",
     markers=True,
@@ -81,14 +182,30 @@ st.plotly_chart(fig3, use_container_width=True)
 # CHART 4: CARE LOAD VS AGE
 st.subheader("Care Load vs Age (Burnout Risk)")
 
-fig4 = px.scatter(
-    df,
-    x="total_care_load",
-    y="age",
-    color="work_mode",
-    size="burnout_risk",
-    hover_data=["burnout_risk"],
-    title="Care Load vs Age"
-)
+if matched > scatter_point_limit:
+    fig4 = px.scatter(
+        view_bins[view_bins["work_mode"].isin(work_modes)],
+        x="total_care_load",
+        y="age",
+        color="work_mode",
+        size="respondents",
+        hover_data=["burnout_risk", "respondents"],
+        title="Care Load vs Age (binned)"
+    )
+else:
+    # Row positions from the bitmap index; no selected work mode means no points
+    positions = (
+        select_rows(filter_index, {"work_mode": work_modes, **dict(filter_key)})
+        if work_modes else np.array([], dtype=np.intp)
+    )
+    fig4 = px.scatter(
+        df.iloc[positions],
+        x="total_care_load",
+        y="age",
+        color="work_mode",
+        size="burnout_risk",
+        hover_data=["burnout_risk"],
+        title="Care Load vs Age"
+    )
 
 st.plotly_chart(fig4, use_container_width=True)
@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BASE_DIR)
+
+import pandas as pd
+import clean_data
+import morale
+from data_io import columnar_path, read_dataset
+from decoders import decode_percentage, decode_productivity, decode_work_mode_2020
+
+# =============================
+# BENCHMARK HARNESS
+# =============================
+# Times each pipeline stage (load -> clean -> derive -> aggregate) on the
+# bundled raw exports and on copies scaled up by resampling responses. Wall
+# time is the best of --repeat untraced runs; peak memory comes from one
+# extra run under tracemalloc. Every run is saved to results/ and compared
+# with the previous run so regressions show up across commits.
+
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+YEARS = (2020, 2021)
+
+# =============================
+# SCALED DATASETS
+# =============================
+def scaled_raw_path(year, scale):
+    return os.path.join(DATA_DIR, f"x{scale}", f"{year}_rws.csv")
+
+def make_scaled_raw(year, scale):
+    # Resample whole responses with replacement, streamed one original-sized
+    # block at a time so even 1000x copies never sit in memory
+    path = scaled_raw_path(year, scale)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    source = os.path.join(BASE_DIR, "datasets", f"{year}_rws.csv")
+    encoding = clean_data.detect_encoding(source)
+    raw = pd.read_csv(source, encoding=encoding, dtype=str, keep_default_na=False)
+    tmp_path = path + ".tmp"
+    raw.to_csv(tmp_path, index=False, encoding=encoding)
+    for block in range(1, scale):
+        sample = raw.sample(n=len(raw), replace=True, random_state=block)
+        sample.to_csv(tmp_path, mode="a", header=False, index=False, encoding=encoding)
+    os.replace(tmp_path, path)
+    return path
+
+def scaled_cleaned_path(year, scale):
+    return clean_data.output_path_for(scaled_raw_path(year, scale))
+
+# =============================
+# STAGES
+# =============================
+# Each stage maps to (years, setup, run): setup(year, scale) prepares inputs
+# and is not timed; run(inputs) is timed and returns the rows it processed.
+
+def _setup_raw(year, scale):
+    return make_scaled_raw(year, scale)
+
+def _setup_cleaned(year, scale):
+    raw = make_scaled_raw(year, scale)
+    cleaned = scaled_cleaned_path(year, scale)
+    clean_data.clean_file(raw, cleaned)
+    return cleaned
+
+def _setup_cleaned_csv_only(year, scale):
+    cleaned = _setup_cleaned(year, scale)
+    # Hide the Parquet twin so read_dataset has to parse the CSV
+    return cleaned, columnar_path(cleaned)
+
+def _setup_frame(year, scale):
+    return read_dataset(_setup_cleaned(year, scale))
+
+def _setup_derived(year, scale):
+    return morale._build_dataframe(_setup_cleaned(year, scale))
+
+def run_encoding(path):
+    digest, is_utf8 = clean_data._scan_file(path)
+    clean_data._sniff_encoding(path, is_utf8)
+    return None
+
+def run_clean(path):
+    clean_data.clean_file(path, path.replace("_rws.csv", "_bench_cleaned.csv"), force=True)
+    return None
+
+def run_clean_chunked(path):
+    clean_data.clean_file(path, path.replace("_rws.csv", "_bench_chunked.csv"), chunksize=50000, force=True)
+    return None
+
+def run_load_csv(paths):
+    cleaned, parquet = paths
+    hidden = parquet + ".hidden"
+    os.replace(parquet, hidden)
+    try:
+        return len(read_dataset(cleaned))
+    finally:
+        os.replace(hidden, parquet)
+
+def run_load_parquet(path):
+    return len(read_dataset(path))
+
+def run_decode(df):
+    if "how_much_of_your_work" in df.columns:
+        decode_percentage(df["how_much_of_your_work"], 2021)
+    else:
+        decode_percentage(df["remote_time_last_3m"], 2020)
+        decode_work_mode_2020(df["remote_time_last_year"])
+    decode_productivity(df["relative_remote_productivity"])
+    return len(df)
+
+def run_derive(path):
+    return len(morale._build_dataframe(path))
+
+def run_aggregate(df):
+    cube = morale.build_cube(df)
+    morale.cube_aggregate(cube, "work_mode")
+    morale.cube_aggregate(cube, "org_preparedness_last_year")
+    morale.bin_care_load_vs_age(df)
+    return len(df)
+
+STAGES = {
+    "encoding": (YEARS, _setup_raw, run_encoding),
+    "clean": (YEARS, _setup_raw, run_clean),
+    "clean_chunked": (YEARS, _setup_raw, run_clean_chunked),
+    "load_csv": (YEARS, _setup_cleaned_csv_only, run_load_csv),
+    "load_parquet": (YEARS, _setup_cleaned, run_load_parquet),
+    "decode": (YEARS, _setup_frame, run_decode),
+    "derive": ((2020,), _setup_cleaned, run_derive),
+    "aggregate": ((2020,), _setup_derived, run_aggregate),
+}
+
+# =============================
+# MEASUREMENT
+# =============================
+def measure(run, inputs, repeat):
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = run(inputs)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak, rows
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def latest_result():
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith(".json"))
+    if not files:
+        return None
+    with open(os.path.join(RESULTS_DIR, files[-1])) as f:
+        return json.load(f)
+
+def run_benchmarks(stages, scales, repeat):
+    results = []
+    for scale in scales:
+        for stage in stages:
+            years, setup, run = STAGES[stage]
+            for year in years:
+                inputs = setup(year, scale)
+                seconds, peak, rows = measure(run, inputs, repeat)
+                results.append({
+                    "stage": stage, "year": year, "scale": scale,
+                    "rows": rows, "seconds": round(seconds, 6),
+                    "peak_mb": round(peak / 1e6, 3),
+                })
+                print(f"{stage:>14} {year} x{scale:<5} {seconds * 1000:10.1f} ms {peak / 1e6:10.1f} MB")
+    return results
+
+def report_changes(previous, results):
+    if not previous:
+        return
+    before = {(r["stage"], r["year"], r["scale"]): r for r in previous["results"]}
+    print(f"\n--- Change vs {previous['commit']} ({previous['timestamp']}) ---")
+    for result in results:
+        old = before.get((result["stage"], result["year"], result["scale"]))
+        if not old or not old["seconds"]:
+            continue
+        change = (result["seconds"] / old["seconds"] - 1) * 100
+        flag = "  <-- slower" if change > 10 else ""
+        print(f"{result['stage']:>14} {result['year']} x{result['scale']:<5} {change:+7.1f}%{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the survey data pipeline.")
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--scales", nargs="*", type=int, default=[1, 10, 100],
+                        help="row multipliers for the resampled datasets (e.g. 1 10 100 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--no-save", action="store_true", help="do not write a results file")
+    args = parser.parse_args(argv)
+
+    previous = latest_result()
+    results = run_benchmarks(args.stages, args.scales, args.repeat)
+    report_changes(previous, results)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        now = datetime.now(timezone.utc)
+        commit = git_commit()
+        record = {
+            "commit": commit,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "results": results,
+        }
+        path = os.path.join(RESULTS_DIR, f"{now:%Y%m%dT%H%M%S}_{commit}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+        print(f"\nSaved results to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import ast
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+
+from bench_pipeline import RESULTS_DIR, git_commit
+
+# =============================
+# IMPORT-TIME PROFILE
+# =============================
+# Cold-start cost of each entry point, measured in a fresh interpreter with
+# `python -X importtime`. The dashboard target imports exactly what app.py
+# imports at module level (read from its source), so a new top-level import
+# there shows up here. Per run we keep the best wall time (interpreter start
+# + imports), the total import time and the packages that cost the most.
+#
+# Modules in FORBIDDEN must never be loaded on a target's import path; the
+# run exits non-zero if one is, so this doubles as a check that matplotlib /
+# seaborn stay out of the dashboard.
+
+IMPORT_RESULTS_DIR = os.path.join(RESULTS_DIR, "imports")
+PLOTTING_MODULES = ("matplotlib", "seaborn")
+TARGETS = {
+    "dashboard": None,  # filled from app.py's own imports
+    "morale": ["morale"],
+    "api": ["api"],
+    "member2_charts": ["productivity_charts"],
+}
+FORBIDDEN = {
+    "dashboard": PLOTTING_MODULES + ("scipy",),
+    "morale": PLOTTING_MODULES,
+    "api": PLOTTING_MODULES,
+    "member2_charts": PLOTTING_MODULES,
+}
+
+def module_imports(path):
+    # Top-level `import x` / `from x import y` statements of a script
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def target_modules(name):
+    if name == "dashboard":
+        return module_imports(os.path.join(BASE_DIR, "app.py"))
+    return TARGETS[name]
+
+def _import_script(modules):
+    paths = [BASE_DIR, os.path.join(BASE_DIR, "member2")]
+    lines = [f"import sys; sys.path[:0] = {paths!r}"]
+    lines += [f"import {module}" for module in modules]
+    # Loaded top-level packages go to stdout; -X importtime writes to stderr
+    lines.append("print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))")
+    return "\n".join(lines)
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package", nesting shown
+    # by indentation of the package name
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, package = line[len("import time:"):].split("|")
+        # One separator space, then two spaces per nesting level
+        depth = (len(package) - len(package.lstrip()) - 1) // 2
+        entries.append({
+            "module": package.strip(), "depth": depth,
+            "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+        })
+    return entries
+
+def profile_target(name, repeat):
+    script = _import_script(target_modules(name))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=BASE_DIR, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"importing {name} failed:\n{proc.stderr[-2000:]}")
+        if best is None or wall < best[0]:
+            best = (wall, proc)
+
+    wall, proc = best
+    entries = parse_importtime(proc.stderr)
+    # Self time summed per top-level package, wherever it was imported from
+    packages = {}
+    for entry in entries:
+        root = entry["module"].split(".")[0]
+        packages[root] = packages.get(root, 0) + entry["self_us"]
+    loaded = set(proc.stdout.split())
+    return {
+        "target": name,
+        "wall_seconds": round(wall, 4),
+        "import_seconds": round(sum(e["cumulative_us"] for e in entries if e["depth"] == 0) / 1e6, 4),
+        "modules": len(entries),
+        "top_packages": {
+            root: round(us / 1e6, 4)
+            for root, us in sorted(packages.items(), key=lambda item: -item[1])[:10]
+        },
+        "forbidden_loaded": sorted(loaded.intersection(FORBIDDEN.get(name, ()))),
+    }
+
+def latest_import_result():
+    if not os.path.isdir(IMPORT_RESULTS_DIR):
+        return None
+    files = sorted(f for f in os.listdir(IMPORT_RESULTS_DIR) if f.endswith(".json"))
+    if not files:
+        return None
+    with open(os.path.join(IMPORT_RESULTS_DIR, files[-1])) as f:
+        return json.load(f)
+
+def report_changes(previous, results):
+    if not previous:
+        return
+    before = {r["target"]: r for r in previous["results"]}
+    print(f"\n--- Change vs {previous['commit']} ({previous['timestamp']}) ---")
+    for result in results:
+        old = before.get(result["target"])
+        if not old or not old["wall_seconds"]:
+            continue
+        change = (result["wall_seconds"] / old["wall_seconds"] - 1) * 100
+        flag = "  <-- slower" if change > 10 else ""
+        print(f"{result['target']:>16} {change:+7.1f}%{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile cold-start import time of the entry points.")
+    parser.add_argument("--targets", nargs="*", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target (best is kept)")
+    parser.add_argument("--no-save", action="store_true", help="do not write a results file")
+    args = parser.parse_args(argv)
+
+    previous = latest_import_result()
+    results = []
+    for name in args.targets:
+        result = profile_target(name, args.repeat)
+        results.append(result)
+        top = ", ".join(f"{root} {seconds * 1000:.0f}" for root, seconds in list(result["top_packages"].items())[:4])
+        print(f"{name:>16} {result['wall_seconds'] * 1000:8.0f} ms wall {result['import_seconds'] * 1000:8.0f} ms imports"
+              f"  ({top} ms)")
+        if result["forbidden_loaded"]:
+            print(f"{'':>16} loads {', '.join(result['forbidden_loaded'])} at import time")
+    report_changes(previous, results)
+
+    if not args.no_save:
+        os.makedirs(IMPORT_RESULTS_DIR, exist_ok=True)
+        now = datetime.now(timezone.utc)
+        commit = git_commit()
+        record = {
+            "commit": commit,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        path = os.path.join(IMPORT_RESULTS_DIR, f"{now:%Y%m%dT%H%M%S}_{commit}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+        print(f"\nSaved results to {path}")
+
+    return 1 if any(result["forbidden_loaded"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+# =============================
+# BITMAP INDEX
+# =============================
+# One packed bitmap (np.packbits, 1 bit per row) per value of every indexed
+# column, built once when the data is loaded. A filter is resolved without
+# touching the frame: values of one column are OR-ed, columns are AND-ed,
+# and the result is unpacked into row positions. Cost grows with the number
+# of selected values and n/8 bytes per bitmap, not with the frame's width,
+# and missing values are simply absent from every bitmap.
+
+def build_bitmap_index(df, columns):
+    bitmaps = {}
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], sort=True)
+        bitmaps[col] = {
+            value: np.packbits(codes == code, bitorder="little")
+            for code, value in enumerate(uniques)
+        }
+    return {"rows": len(df), "bitmaps": bitmaps}
+
+def match_bitmap(index, filters):
+    # filters: column -> selected values; empty/None selections are ignored
+    empty = np.zeros((index["rows"] + 7) // 8, dtype=np.uint8)
+    result = None
+    for col, values in filters.items():
+        if not values:
+            continue
+        bitmaps = index["bitmaps"][col]
+        selected = [bitmaps[value] for value in values if value in bitmaps]
+        column_match = np.bitwise_or.reduce(selected) if selected else empty
+        result = column_match if result is None else result & column_match
+    if result is None:
+        # No constraint: every row matches
+        return np.packbits(np.ones(index["rows"], dtype=bool), bitorder="little")
+    return result
+
+def select_rows(index, filters):
+    # Row positions matching every filter, for use with df.iloc / df.take
+    bits = np.unpackbits(match_bitmap(index, filters), count=index["rows"], bitorder="little")
+    return np.flatnonzero(bits)
+
+def index_values(index, col):
+    return list(index["bitmaps"][col])
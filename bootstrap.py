@@ -0,0 +1,111 @@
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# =============================
+# BATCHED BOOTSTRAP CONFIDENCE INTERVALS
+# =============================
+# Percentile bootstrap of the mean for every group at once. Rows are sorted
+# by group so each group is one contiguous slice; a block of replicates is a
+# single (replicates x rows) index array where every column draws from its
+# own group's slice, and np.add.reduceat turns the gathered values into all
+# group means in one pass. Several metrics can share one set of draws, so
+# each extra metric only costs a gather. Blocks are sized from a byte
+# budget, so memory stays flat as the row count grows, and can optionally
+# run on a thread pool (NumPy releases the GIL); each block has its own
+# seed, so results do not depend on the number of workers.
+
+DEFAULT_REPLICATES = 10000
+# Replicates per block: as many as fit in BLOCK_BYTES for the rows being
+# resampled, capped at MAX_BLOCK_REPLICATES. A (replicate, row) cell costs a
+# float32 draw, its float64 scaled copy, an intp index and one gathered
+# float64 value + missing flag (metrics are gathered one after another).
+BLOCK_BYTES = 8 << 20
+MAX_BLOCK_REPLICATES = 250
+CELL_BYTES = 32
+
+def block_replicates_for(rows, block_bytes=BLOCK_BYTES):
+    return int(min(MAX_BLOCK_REPLICATES, max(1, block_bytes // (CELL_BYTES * max(rows, 1)))))
+
+def _block_means(samples, present, starts, sizes, column_offsets, column_sizes, replicates, seed):
+    # Returns (metrics x replicates x groups); every metric is gathered from
+    # the same drawn rows
+    rng = np.random.default_rng(seed)
+    # float32 draws halve the RNG cost; the product with the int64 sizes is
+    # computed in float64, so it stays strictly below each group's size
+    draws = rng.random((replicates, samples.shape[1]), dtype=np.float32)
+    index = column_offsets + (draws * column_sizes).astype(np.intp)
+    del draws
+    means = []
+    for sample, flags in zip(samples, present):
+        sums = np.add.reduceat(sample[index], starts, axis=1)
+        # Missing values count as zero and are left out of the denominator
+        counts = sizes if flags is None else np.add.reduceat(flags[index], starts, axis=1, dtype=np.int64)
+        means.append(sums / counts)
+    return np.stack(means)
+
+def bootstrap_means(values, by, replicates=DEFAULT_REPLICATES, confidence=0.95, seed=0,
+                    workers=1, block_bytes=BLOCK_BYTES):
+    # values: numeric Series, or DataFrame of metrics resampled together
+    # (one draw of respondents per replicate, shared by every column).
+    # by: Series or list of Series aligned with it.
+    # Returns mean, ci_low, ci_high and n per group; for a DataFrame the
+    # columns are (metric, stat). Missing values are skipped per metric.
+    # workers > 1 (or None for one per CPU) spreads blocks over threads.
+    single = isinstance(values, pd.Series)
+    metrics = values.to_frame("__value__") if single else values
+    keys = by if isinstance(by, list) else [by]
+    names = [key.name for key in keys]
+    groups = pd.concat(keys, axis=1, keys=names)
+    frame = pd.concat([groups, metrics], axis=1)
+    frame = frame[groups.notna().all(axis=1) & metrics.notna().any(axis=1)]
+    result_columns = ["mean", "ci_low", "ci_high", "n"]
+    if frame.empty:
+        # Still indexed by the group names, so callers can join on it
+        index = pd.MultiIndex.from_arrays([[]] * len(names), names=names) if len(names) > 1 else pd.Index([], name=names[0])
+        empty = pd.DataFrame(columns=result_columns, index=index)
+        return empty if single else pd.concat({metric: empty for metric in metrics.columns}, axis=1)
+
+    grouped = frame.groupby(names, sort=True, observed=True)
+    codes = grouped.ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    # One contiguous float64 row per metric, rows sorted by group
+    samples = frame[list(metrics.columns)].to_numpy(dtype=float)[order].T.copy()
+    missing = np.isnan(samples)
+    present = [~flags if flags.any() else None for flags in missing]
+    samples[missing] = 0.0
+    sizes = np.bincount(codes)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    # Per row: where its group's slice starts and how long it is
+    column_offsets = np.repeat(starts, sizes)
+    column_sizes = np.repeat(sizes, sizes)
+
+    block_replicates = block_replicates_for(len(frame), block_bytes)
+    blocks = [min(block_replicates, replicates - done) for done in range(0, replicates, block_replicates)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    args = (samples, present, starts, sizes, column_offsets, column_sizes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if workers == 1 or len(blocks) == 1:
+            means = [_block_means(*args, size, block_seed) for size, block_seed in zip(blocks, seeds)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                means = list(pool.map(lambda job: _block_means(*args, *job), zip(blocks, seeds)))
+    means = np.concatenate(means, axis=1)
+
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        # A group with no values for a metric has no interval
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanpercentile(means, [tail, 100 - tail], axis=1)
+    index = grouped.size().index
+    tables = {
+        metric: pd.DataFrame({
+            "mean": grouped[metric].mean().to_numpy(),
+            "ci_low": low[j],
+            "ci_high": high[j],
+            "n": grouped[metric].count().to_numpy(),
+        }, index=index)[result_columns]
+        for j, metric in enumerate(metrics.columns)
+    }
+    return tables["__value__"] if single else pd.concat(tables, axis=1)
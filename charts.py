@@ -0,0 +1,113 @@
+import os
+import json
+import pickle
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from instrumentation import stage
+from manifest import file_lock, write_json_atomic
+
+# =============================
+# CACHED CHART RENDERING
+# =============================
+# A chart is described by a spec: the PNG filename, a top-level draw function,
+# the aggregate it plots and its style options. Each spec is hashed (draw
+# function source + data + style); charts whose hash matches the last render
+# and whose PNG still exists are skipped, the rest are rendered in worker
+# processes with the non-interactive Agg backend.
+
+CHART_CACHE_FILE = ".chart_hashes.json"
+
+def chart_spec(filename, draw, data, **style):
+    return {"filename": filename, "draw": draw, "data": data, "style": style}
+
+def _data_digest(data, digest):
+    if isinstance(data, pd.DataFrame):
+        digest.update(repr((list(data.columns), [str(t) for t in data.dtypes])).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    elif isinstance(data, pd.Series):
+        digest.update(repr((data.name, str(data.dtype), data.index.name)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        digest.update(pickle.dumps(data))
+
+def chart_digest(spec):
+    digest = hashlib.sha256()
+    draw = spec["draw"]
+    # Not __module__: the same function is "__main__" under `python morale.py`
+    # and "morale" under pipeline.py, and both must share cache entries
+    digest.update(draw.__qualname__.encode("utf-8"))
+    digest.update(inspect.getsource(draw).encode("utf-8"))
+    _data_digest(spec["data"], digest)
+    digest.update(json.dumps(spec["style"], sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+def _render(spec, path):
+    with stage("chart_render", chart=spec["filename"]):
+        return _draw_to_file(spec, path)
+
+def _draw_to_file(spec, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    style = dict(spec["style"])
+    dpi = style.pop("dpi", None)
+    figsize = style.pop("figsize", None)
+    plt.figure(figsize=figsize)
+    spec["draw"](spec["data"], **style)
+    plt.savefig(path, dpi=dpi if dpi is not None else "figure")
+    plt.close()
+    return path
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def render_charts(specs, output_dir, workers=None, force=False):
+    # Returns the paths that were (re)rendered; force redraws every chart
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CHART_CACHE_FILE)
+    cache = _load_cache(cache_path)
+
+    pending = []
+    for spec in specs:
+        path = os.path.join(output_dir, spec["filename"])
+        digest = chart_digest(spec)
+        if not force and cache.get(spec["filename"]) == digest and os.path.exists(path):
+            continue
+        pending.append((spec, path, digest))
+
+    rendered = []
+    error = None
+    if len(pending) == 1:
+        # Not worth starting a pool for one figure
+        spec, path, digest = pending[0]
+        _render(spec, path)
+        rendered.append((spec, path, digest))
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(pool.submit(_render, spec, path), spec, path, digest) for spec, path, digest in pending]
+            for future, spec, path, digest in futures:
+                try:
+                    future.result()
+                    rendered.append((spec, path, digest))
+                except Exception as e:
+                    error = error or e
+
+    # Remember what was drawn even if another chart failed. Locked re-read +
+    # atomic replace, so concurrent renders into one directory keep each
+    # other's entries.
+    if rendered:
+        with file_lock(cache_path):
+            cache = _load_cache(cache_path)
+            for spec, _, digest in rendered:
+                cache[spec["filename"]] = digest
+            write_json_atomic(cache_path, cache)
+    if error is not None:
+        raise error
+    return [path for _, path, _ in rendered]
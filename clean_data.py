@@ -1,199 +1,318 @@
 import pandas as pd
 import numpy as np
-import chardet
 import os
 import re
+import json
+import codecs
+import hashlib
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from chardet import UniversalDetector
+from instrumentation import stage
+from data_io import columnar_is_fresh, columnar_path, read_dataset, write_columnar, write_columnar_chunks
+from manifest import data_digest, file_digest, file_lock, is_up_to_date, record_build, write_json_atomic
 
-def detect_encoding(file_path):
-    with open(file_path, 'rb') as f:
-        result = chardet.detect(f.read(100000))  # Sample first 100KB
-    return result['encoding']
+# =============================
+# HEADER RENAME RULES
+# =============================
+# Keyword rules are checked in order and the first keyword contained in the
+# (lowercased) header wins.
+RENAME_RULES_2020 = {
+    "response id": "response_id",
+    "year were you born": "birth_year",
+    "what is your gender": "gender",
+    "industry? (detailed)": "industry_detailed",
+    "industry": "industry",
+    "occupation? (detailed)": "occupation_detailed",
+    "occupation": "occupation",
+    "employed by your organisation": "org_size",
+    "manage people": "is_manager",
+    "describe your household": "household_type",
+    "long have you been in your current job": "job_tenure",
+    "metro / regional": "metro_regional",
 
-def clean_file(input_file, output_file):
-    print(f"Processing {input_file}...")
-    
-    # 1. Detect and Load with correct encoding
-    encoding = detect_encoding(input_file)
-    print(f"Detected encoding: {encoding}")
-    
-    try:
-        df = pd.read_csv(input_file, encoding=encoding)
-    except Exception as e:
-        print(f"Failed to load with {encoding}, trying ISO-8859-1. Error: {e}")
-        df = pd.read_csv(input_file, encoding='ISO-8859-1')
+    # Time & Org - Last Year
+    "spend remote working last year": "remote_time_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - my organisation encouraged": "org_encouragement_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - my organisation was well prepared": "org_preparedness_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - it was common": "remote_prevalence_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - it was easy to get permission": "permission_ease_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - i could easily collaborate": "collaboration_ease_last_year",
+    "remote working last year, how strongly do you agree or disagree with the following statements? - i would recommend": "remote_recommendation_last_year",
+    "preferred to work remotely last year": "preferred_remote_last_year",
 
-    # 2. Rename Columns
-    if "2020" in input_file:
-        rename_rules = {
-            "response id": "response_id",
-            "year were you born": "birth_year",
-            "what is your gender": "gender",
-            "industry? (detailed)": "industry_detailed",
-            "industry": "industry",
-            "occupation? (detailed)": "occupation_detailed",
-            "occupation": "occupation",
-            "employed by your organisation": "org_size",
-            "manage people": "is_manager",
-            "describe your household": "household_type",
-            "long have you been in your current job": "job_tenure",
-            "metro / regional": "metro_regional",
-            
-            # Time & Org - Last Year
-            "spend remote working last year": "remote_time_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - my organisation encouraged": "org_encouragement_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - my organisation was well prepared": "org_preparedness_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - it was common": "remote_prevalence_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - it was easy to get permission": "permission_ease_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - i could easily collaborate": "collaboration_ease_last_year",
-            "remote working last year, how strongly do you agree or disagree with the following statements? - i would recommend": "remote_recommendation_last_year",
-            "preferred to work remotely last year": "preferred_remote_last_year",
-
-            # Time & Org - Last 3 Months
-            "spend remote working in the last 3 months": "remote_time_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - my organisation encouraged": "org_encouragement_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - my organisation was well prepared": "org_preparedness_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - it was common": "remote_prevalence_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - it was easy to get permission": "permission_ease_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - i could easily collaborate": "collaboration_ease_last_3m",
-            "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - i would recommend": "remote_recommendation_last_3m",
-            "preferred to work remotely in the last 3 months": "preferred_remote_last_3m",
-
-            # Future
-            "prefer to work remotely?": "future_preferred_remote_time",
-            "employer would encourage more remote working": "future_employer_encouragement_likelihood",
-            "employer would make changes to support remote working": "future_employer_support_likelihood",
-            "choice about whether i work remotely": "future_location_choice_likelihood",
-
-            # Productivity & Hours
-            "productivity when you work remotely": "relative_remote_productivity",
-            "employer's workplace, how many hours would you spend doing the following activities? - preparing for work and commuting": "office_commute_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - working": "office_work_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - personal and family time": "office_family_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "office_domestic_hours",
-            "remote work, how many hours would you spend doing the following activities? - preparing for work and commuting": "remote_commute_hours",
-            "remote work, how many hours would you spend doing the following activities? - working": "remote_work_hours",
-            "remote work, how many hours would you spend doing the following activities? - personal and family time": "remote_family_hours",
-            "remote work, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "remote_domestic_hours",
-        }
-    else:
-        # 2021 Rules
-        rename_rules = {
-            "year were you born": "birth_year",
-            "what is your gender": "gender",
-            "industry": "industry",
-            "occupation": "occupation",
-            "employed by your organisation": "org_size_total",
-            "manage people": "is_manager",
-            "describe your household": "household_type",
-            "long have you been in your current job": "job_tenure_length",
-            "metro / regional": "location_type",
-            "metro_or_regional": "location_type",
-            
-            # Time spent
-            "spend remote working last year": "remote_time_last_year",
-            "spend remote working in the last 3 months": "remote_time_last_3_months",
-            "preferred to work remotely last year": "preferred_remote_last_year",
-            "preferred to work remotely in the last 3 months": "preferred_remote_last_3_months",
-            "prefer to work remotely": "preferred_remote_future",
-            
-            # Org scores
-            "encouraged people to work remotely": "org_encouragement_score",
-            "well prepared for me to work remotely": "org_preparedness_score",
-            "common for people in my organisation": "org_remote_culture_prevalence",
-            "easy to get permission": "remote_permission_ease",
-            "collaborate with colleagues": "remote_collaboration_ease",
-            "recommend remote working": "remote_recommendation_score",
-            "employer would encourage": "future_employer_support_likelihood",
-            
-            # Productivity
-            "productivity when you work remotely": "relative_remote_productivity",
-            
-            # Hours - Workplace
-            "employer's workplace, how many hours would you spend doing the following activities? - preparing for work and commuting": "office_day_commute_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - working": "office_day_work_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - personal and family time": "office_day_personal_hours",
-            "employer's workplace, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "office_day_caring_hours",
-            
-            # Hours - Remote
-            "remote work, how many hours would you spend doing the following activities? - preparing for work and commuting": "remote_day_commute_hours",
-            "remote work, how many hours would you spend doing the following activities? - working": "remote_day_work_hours",
-            "remote work, how many hours would you spend doing the following activities? - personal and family time": "remote_day_personal_hours",
-            "remote work, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "remote_day_caring_hours",
-        }
+    # Time & Org - Last 3 Months
+    "spend remote working in the last 3 months": "remote_time_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - my organisation encouraged": "org_encouragement_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - my organisation was well prepared": "org_preparedness_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - it was common": "remote_prevalence_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - it was easy to get permission": "permission_ease_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - i could easily collaborate": "collaboration_ease_last_3m",
+    "remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - i would recommend": "remote_recommendation_last_3m",
+    "preferred to work remotely in the last 3 months": "preferred_remote_last_3m",
 
-    descriptive_rules = {
-        "most significant barrier": "barrier_most",
-        "least significant barrier": "barrier_least",
-        "biggest barriers": "barrier_most",
-        "smallest barriers": "barrier_least",
-        "worst aspect": "worst_remote",
-        "best aspect": "best_remote",
-        "have the following barriers": "barrier"
-    }
+    # Future
+    "prefer to work remotely?": "future_preferred_remote_time",
+    "employer would encourage more remote working": "future_employer_encouragement_likelihood",
+    "employer would make changes to support remote working": "future_employer_support_likelihood",
+    "choice about whether i work remotely": "future_location_choice_likelihood",
 
-    new_columns_list = []
-    seen = {}
-    for col in df.columns:
-        col_lower = col.lower()
-        matched_name = None
-        
+    # Productivity & Hours
+    "productivity when you work remotely": "relative_remote_productivity",
+    "employer's workplace, how many hours would you spend doing the following activities? - preparing for work and commuting": "office_commute_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - working": "office_work_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - personal and family time": "office_family_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "office_domestic_hours",
+    "remote work, how many hours would you spend doing the following activities? - preparing for work and commuting": "remote_commute_hours",
+    "remote work, how many hours would you spend doing the following activities? - working": "remote_work_hours",
+    "remote work, how many hours would you spend doing the following activities? - personal and family time": "remote_family_hours",
+    "remote work, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "remote_domestic_hours",
+}
+
+# 2021 Rules
+RENAME_RULES_2021 = {
+    "year were you born": "birth_year",
+    "what is your gender": "gender",
+    "industry": "industry",
+    "occupation": "occupation",
+    "employed by your organisation": "org_size_total",
+    "manage people": "is_manager",
+    "describe your household": "household_type",
+    "long have you been in your current job": "job_tenure_length",
+    "metro / regional": "location_type",
+    "metro_or_regional": "location_type",
+
+    # Time spent
+    "spend remote working last year": "remote_time_last_year",
+    "spend remote working in the last 3 months": "remote_time_last_3_months",
+    "preferred to work remotely last year": "preferred_remote_last_year",
+    "preferred to work remotely in the last 3 months": "preferred_remote_last_3_months",
+    "prefer to work remotely": "preferred_remote_future",
+
+    # Org scores
+    "encouraged people to work remotely": "org_encouragement_score",
+    "well prepared for me to work remotely": "org_preparedness_score",
+    "common for people in my organisation": "org_remote_culture_prevalence",
+    "easy to get permission": "remote_permission_ease",
+    "collaborate with colleagues": "remote_collaboration_ease",
+    "recommend remote working": "remote_recommendation_score",
+    "employer would encourage": "future_employer_support_likelihood",
+
+    # Productivity
+    "productivity when you work remotely": "relative_remote_productivity",
+
+    # Hours - Workplace
+    "employer's workplace, how many hours would you spend doing the following activities? - preparing for work and commuting": "office_day_commute_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - working": "office_day_work_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - personal and family time": "office_day_personal_hours",
+    "employer's workplace, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "office_day_caring_hours",
+
+    # Hours - Remote
+    "remote work, how many hours would you spend doing the following activities? - preparing for work and commuting": "remote_day_commute_hours",
+    "remote work, how many hours would you spend doing the following activities? - working": "remote_day_work_hours",
+    "remote work, how many hours would you spend doing the following activities? - personal and family time": "remote_day_personal_hours",
+    "remote work, how many hours would you spend doing the following activities? - caring and domestic responsibilities": "remote_day_caring_hours",
+}
+
+# Barriers and Aspects (2020 only, checked after the keyword rules)
+COMPLEX_RENAMES_2020 = [
+    (r"most significant barrier.*connectivity.*caring responsibilities", "most_barrier_infra_caring"),
+    (r"least significant barrier.*connectivity.*caring responsibilities", "least_barrier_infra_caring"),
+    (r"most significant barrier.*connectivity.*lack of motivation", "most_barrier_security_motivation"),
+    (r"least significant barrier.*connectivity.*lack of motivation", "least_barrier_security_motivation"),
+    (r"most significant barrier.*connectivity.*my workspace", "most_barrier_systems_workspace"),
+    (r"least significant barrier.*connectivity.*my workspace", "least_barrier_systems_workspace"),
+    (r"most significant barrier.*connectivity.*management discourages", "most_barrier_skills_living"),
+    (r"least significant barrier.*connectivity.*management discourages", "least_barrier_skills_living"),
+    (r"most significant barrier.*it equipment.*lack of motivation", "most_barrier_collab_motivation"),
+    (r"least significant barrier.*it equipment.*lack of motivation", "least_barrier_collab_motivation"),
+
+    (r"best aspect.*family.*learning opportunities", "best_aspect_worklife_learning"),
+    (r"worst aspect.*family.*learning opportunities", "worst_aspect_worklife_learning"),
+    (r"best aspect.*family.*mental wellbeing", "best_aspect_social_wellbeing"),
+    (r"worst aspect.*family.*mental wellbeing", "worst_aspect_social_wellbeing"),
+    (r"best aspect.*family.*job satisfaction", "best_aspect_expenses_satisfaction"),
+    (r"worst aspect.*family.*job satisfaction", "worst_aspect_expenses_satisfaction"),
+    (r"best aspect.*hours.*mental wellbeing", "best_aspect_hours_commitments"),
+    (r"worst aspect.*hours.*mental wellbeing", "worst_aspect_hours_commitments"),
+    (r"best aspect.*hours.*job satisfaction", "best_aspect_personal_relationships"),
+    (r"worst aspect.*hours.*job satisfaction", "worst_aspect_personal_relationships"),
+]
+
+DESCRIPTIVE_RULES = {
+    "most significant barrier": "barrier_most",
+    "least significant barrier": "barrier_least",
+    "biggest barriers": "barrier_most",
+    "smallest barriers": "barrier_least",
+    "worst aspect": "worst_remote",
+    "best aspect": "best_remote",
+    "have the following barriers": "barrier"
+}
+
+# =============================
+# COMPILED HEADER RESOLVER
+# =============================
+DESCRIPTIVE_SPLIT = re.compile(r'[\?\:\-]\s+')
+PARENTHESISED = re.compile(r'\(.*?\)')
+REPEATED_UNDERSCORES = re.compile(r'_+')
+
+@lru_cache(maxsize=None)
+def build_header_resolver(survey_year):
+    # Built once per survey year and shared by every file of that year. Rule
+    # order is preserved so the first matching rule still wins; headers are
+    # memoised, so repeated headers across waves resolve with one dict lookup.
+    if survey_year == "2020":
+        keyword_rules = tuple(RENAME_RULES_2020.items())
+        complex_rules = tuple((re.compile(pattern), name) for pattern, name in COMPLEX_RENAMES_2020)
+    else:
+        keyword_rules = tuple(RENAME_RULES_2021.items())
+        complex_rules = ()
+    descriptive_rules = tuple(DESCRIPTIVE_RULES.items())
+
+    @lru_cache(maxsize=None)
+    def resolve(col_lower):
         # 1. Check specific rules first
-        for key, new_name in rename_rules.items():
+        for key, new_name in keyword_rules:
             if key in col_lower:
-                matched_name = new_name
-                break
-        
+                return new_name
+
         # 2. Special handling for 2020 Barriers and Aspects (Complex Regex)
-        if not matched_name and "2020" in input_file:
-            complex_renames_2020 = [
-                (r"most significant barrier.*connectivity.*caring responsibilities", "most_barrier_infra_caring"),
-                (r"least significant barrier.*connectivity.*caring responsibilities", "least_barrier_infra_caring"),
-                (r"most significant barrier.*connectivity.*lack of motivation", "most_barrier_security_motivation"),
-                (r"least significant barrier.*connectivity.*lack of motivation", "least_barrier_security_motivation"),
-                (r"most significant barrier.*connectivity.*my workspace", "most_barrier_systems_workspace"),
-                (r"least significant barrier.*connectivity.*my workspace", "least_barrier_systems_workspace"),
-                (r"most significant barrier.*connectivity.*management discourages", "most_barrier_skills_living"),
-                (r"least significant barrier.*connectivity.*management discourages", "least_barrier_skills_living"),
-                (r"most significant barrier.*it equipment.*lack of motivation", "most_barrier_collab_motivation"),
-                (r"least significant barrier.*it equipment.*lack of motivation", "least_barrier_collab_motivation"),
-                
-                (r"best aspect.*family.*learning opportunities", "best_aspect_worklife_learning"),
-                (r"worst aspect.*family.*learning opportunities", "worst_aspect_worklife_learning"),
-                (r"best aspect.*family.*mental wellbeing", "best_aspect_social_wellbeing"),
-                (r"worst aspect.*family.*mental wellbeing", "worst_aspect_social_wellbeing"),
-                (r"best aspect.*family.*job satisfaction", "best_aspect_expenses_satisfaction"),
-                (r"worst aspect.*family.*job satisfaction", "worst_aspect_expenses_satisfaction"),
-                (r"best aspect.*hours.*mental wellbeing", "best_aspect_hours_commitments"),
-                (r"worst aspect.*hours.*mental wellbeing", "worst_aspect_hours_commitments"),
-                (r"best aspect.*hours.*job satisfaction", "best_aspect_personal_relationships"),
-                (r"worst aspect.*hours.*job satisfaction", "worst_aspect_personal_relationships"),
-            ]
-            
-            for pattern, name in complex_renames_2020:
-                if re.search(pattern, col_lower):
-                    matched_name = name
-                    break
-
-        
-        # Check descriptive rules if no match
-        if not matched_name:
-            for phrase, prefix in descriptive_rules.items():
-                if phrase in col_lower:
-                    parts = re.split(r'[\?\:\-]\s+', col_lower)
-                    specific_part = parts[-1] if len(parts) > 1 else col_lower.replace(phrase, "")
-                    clean_part = re.sub(r'\(.*?\)', '', specific_part).strip()
-                    clean_part = ''.join(c if c.isalnum() else '_' for c in clean_part)
-                    clean_part = re.sub(r'_+', '_', clean_part).strip('_')
-                    words = clean_part.split('_')
-                    if len(words) > 4: clean_part = '_'.join(words[:4])
-                    if clean_part: matched_name = f"{prefix}_{clean_part}"
-                    break
+        for pattern, name in complex_rules:
+            if pattern.search(col_lower):
+                return name
+
+        # 3. Check descriptive rules if no match
+        for phrase, prefix in descriptive_rules:
+            if phrase in col_lower:
+                parts = DESCRIPTIVE_SPLIT.split(col_lower)
+                specific_part = parts[-1] if len(parts) > 1 else col_lower.replace(phrase, "")
+                clean_part = PARENTHESISED.sub('', specific_part).strip()
+                clean_part = ''.join(c if c.isalnum() else '_' for c in clean_part)
+                clean_part = REPEATED_UNDERSCORES.sub('_', clean_part).strip('_')
+                words = clean_part.split('_')
+                if len(words) > 4: clean_part = '_'.join(words[:4])
+                if clean_part: return f"{prefix}_{clean_part}"
+                break
 
         # Fallback
-        if not matched_name:
-            clean_name = ''.join(c if c.isalnum() else '_' for c in col_lower).strip('_')
-            words = clean_name.split('_')
-            matched_name = '_'.join(words[:5]) if len(words) > 5 else clean_name
+        clean_name = ''.join(c if c.isalnum() else '_' for c in col_lower).strip('_')
+        words = clean_name.split('_')
+        return '_'.join(words[:5]) if len(words) > 5 else clean_name
+
+    return resolve
+
+# =============================
+# ENCODING DETECTION
+# =============================
+ENCODING_SAMPLE_BYTES = 100000  # chardet never looks past the first 100KB
+ENCODING_BLOCK_BYTES = 16384
+ENCODING_CACHE_FILE = ".encodings.json"
+READ_BLOCK_BYTES = 1 << 20
+
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),  # before UTF-16 LE, which shares its prefix
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def _scan_file(file_path):
+    # One pass over the file: content hash plus a strict UTF-8 check
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")("strict")
+    is_utf8 = True
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_BYTES), b""):
+            digest.update(block)
+            if is_utf8:
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError:
+                    is_utf8 = False
+    if is_utf8:
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            is_utf8 = False
+    return digest.hexdigest(), is_utf8
+
+def _sniff_encoding(file_path, is_utf8):
+    with open(file_path, 'rb') as f:
+        head = f.read(4)
+        for bom, encoding in BYTE_ORDER_MARKS:
+            if head.startswith(bom):
+                return encoding
+        if is_utf8:
+            return "utf-8"
+
+        # Incremental chardet that stops as soon as it is confident
+        f.seek(0)
+        detector = UniversalDetector()
+        remaining = ENCODING_SAMPLE_BYTES
+        while remaining > 0 and not detector.done:
+            block = f.read(min(ENCODING_BLOCK_BYTES, remaining))
+            if not block:
+                break
+            detector.feed(block)
+            remaining -= len(block)
+        detector.close()
+    return detector.result['encoding']
+
+def _encoding_cache_path(file_path):
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), ENCODING_CACHE_FILE)
+
+def _load_encoding_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_encoding(cache_path, digest, encoding):
+    # Locked re-read + write-then-rename, so parallel cleaners add their
+    # entries instead of replacing each other's
+    try:
+        with file_lock(cache_path):
+            cache = _load_encoding_cache(cache_path)
+            cache[digest] = encoding
+            write_json_atomic(cache_path, cache)
+    except OSError as e:
+        print(f"Could not save encoding cache {cache_path}: {e}")
+
+def detect_encoding(file_path):
+    # Results are remembered per file content hash in a sidecar next to the file
+    digest, is_utf8 = _scan_file(file_path)
+    cache_path = _encoding_cache_path(file_path)
+    cache = _load_encoding_cache(cache_path)
+    if digest in cache:
+        return cache[digest]
+
+    encoding = _sniff_encoding(file_path, is_utf8)
+    if encoding:
+        _save_encoding(cache_path, digest, encoding)
+    return encoding
+
+NA_VALUES = ['NA', 'N/A', 'nan', ' ', 'None']
+
+# Anything that changes cleaned output for the same raw file must be part of
+# this digest, otherwise incremental runs would keep stale outputs.
+RULES_DIGEST = data_digest([
+    RENAME_RULES_2020, RENAME_RULES_2021, COMPLEX_RENAMES_2020, DESCRIPTIVE_RULES, NA_VALUES,
+])
+MANIFEST_FILE = ".build_manifest.json"
+
+def rename_columns(columns, input_file):
+    resolve_header = build_header_resolver("2020" if "2020" in input_file else "2021")
+
+    new_columns_list = []
+    seen = {}
+    for col in columns:
+        matched_name = resolve_header(col.lower())
 
         # Uniqueness
         final_name = matched_name
@@ -203,24 +322,347 @@ def clean_file(input_file, output_file):
         else:
             seen[final_name] = 0
         new_columns_list.append(final_name)
+    return new_columns_list
 
-    df.columns = new_columns_list
+def dataset_year_of(input_file):
+    year_match = re.search(r'(\d{4})', os.path.basename(input_file))
+    return int(year_match.group(1)) if year_match else 2021
 
-    # 3. Cleaning Steps
-    df.replace(['NA', 'N/A', 'nan', ' ', 'None'], np.nan, inplace=True)
-    
+def add_age(df, dataset_year):
     # Age Calculation
-    year_match = re.search(r'(\d{4})', os.path.basename(input_file))
-    dataset_year = int(year_match.group(1)) if year_match else 2021
     if 'birth_year' in df.columns:
         df['birth_year'] = pd.to_numeric(df['birth_year'], errors='coerce')
         df['age'] = dataset_year - df['birth_year']
+    return df
+
+def _manifest_path(output_file):
+    return os.path.join(os.path.dirname(os.path.abspath(output_file)), MANIFEST_FILE)
+
+def _built_outputs(output_file):
+    outputs = [output_file]
+    if columnar_is_fresh(output_file):
+        outputs.append(columnar_path(output_file))
+    return outputs
+
+def clean_file(input_file, output_file, chunksize=None, force=False):
+    # Incremental: skip when the raw file, the rules and the outputs are all
+    # unchanged since the last recorded build. Returns True if it cleaned.
+    manifest_path = _manifest_path(output_file)
+    target = os.path.basename(output_file)
+    fingerprint = {
+        "input": file_digest(input_file),
+        "rules": RULES_DIGEST,
+        "chunked": bool(chunksize),
+    }
+    if not force and is_up_to_date(manifest_path, target, fingerprint, _built_outputs(output_file)):
+        print(f"{output_file} is up to date, skipping {input_file}")
+        return False
+
+    with stage("clean_file", file=os.path.basename(input_file), chunked=bool(chunksize)):
+        if chunksize:
+            clean_file_chunked(input_file, output_file, chunksize)
+        else:
+            _clean_whole_file(input_file, output_file)
+    record_build(manifest_path, target, fingerprint, _built_outputs(output_file))
+    return True
+
+def _clean_whole_file(input_file, output_file):
+    print(f"Processing {input_file}...")
+    
+    # 1. Detect and Load with correct encoding
+    with stage("encoding_detect"):
+        encoding = detect_encoding(input_file)
+    print(f"Detected encoding: {encoding}")
+    
+    with stage("csv_parse") as parse:
+        try:
+            df = pd.read_csv(input_file, encoding=encoding)
+        except Exception as e:
+            print(f"Failed to load with {encoding}, trying ISO-8859-1. Error: {e}")
+            df = pd.read_csv(input_file, encoding='ISO-8859-1')
+        parse["rows"] = len(df)
+
+    # 2. Rename Columns
+    with stage("header_rename", columns=len(df.columns)):
+        df.columns = rename_columns(df.columns, input_file)
+
+    # 3. Cleaning Steps
+    with stage("na_replace", rows=len(df)):
+        df.replace(NA_VALUES, np.nan, inplace=True)
+    with stage("feature_engineering", rows=len(df)):
+        add_age(df, dataset_year_of(input_file))
 
     df.dropna(axis=1, how='all', inplace=True)
     df.dropna(axis=0, how='all', inplace=True)
-    df.to_csv(output_file, index=False)
+    with stage("write_outputs", rows=len(df)):
+        df.to_csv(output_file, index=False)
+        write_columnar(df, output_file)
     print(f"Successfully cleaned and saved to {output_file}")
 
+# =============================
+# CHUNKED (STREAMING) CLEANING
+# =============================
+# For exports too large to hold in memory. The header is resolved once, each
+# chunk is cleaned and appended to a partial file, and only the all-empty
+# column drop needs a second pass. Values are kept as text (no per-chunk type
+# inference), so peak memory is bounded by the chunk size.
+
+def _clean_chunks(input_file, encoding, chunksize):
+    header = pd.read_csv(input_file, encoding=encoding, nrows=0).columns
+    names = rename_columns(header, input_file)
+    dataset_year = dataset_year_of(input_file)
+    reader = pd.read_csv(
+        input_file, encoding=encoding, header=0, names=names,
+        dtype=str, na_values=NA_VALUES, chunksize=chunksize,
+    )
+    for chunk in reader:
+        # NA normalisation already happened in the parser via na_values
+        chunk = add_age(chunk, dataset_year)
+        yield chunk.dropna(axis=0, how='all')
+
+def _write_partial(chunks, partial_file):
+    non_empty = set()
+    numeric = None
+    columns = None
+    rows = 0
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+        non_empty.update(chunk.columns[chunk.notna().any()])
+        # A column stays numeric only if every chunk's values parse as numbers
+        parsed = chunk.apply(pd.to_numeric, errors='coerce')
+        chunk_numeric = set(chunk.columns[(parsed.notna() == chunk.notna()).all()])
+        numeric = chunk_numeric if numeric is None else numeric & chunk_numeric
+        chunk.to_csv(partial_file, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+        rows += len(chunk)
+    return columns or [], non_empty, numeric or set(), rows
+
+def clean_file_chunked(input_file, output_file, chunksize=50000):
+    print(f"Processing {input_file} in chunks of {chunksize} rows...")
+
+    with stage("encoding_detect"):
+        encoding = detect_encoding(input_file)
+    print(f"Detected encoding: {encoding}")
+
+    # Parse, rename, NA handling and age are interleaved per chunk, so they
+    # are measured together
+    partial_file = output_file + ".partial"
+    with stage("clean_chunks") as chunked:
+        try:
+            columns, non_empty, numeric, rows = _write_partial(
+                _clean_chunks(input_file, encoding, chunksize), partial_file
+            )
+        except Exception as e:
+            print(f"Failed to load with {encoding}, trying ISO-8859-1. Error: {e}")
+            columns, non_empty, numeric, rows = _write_partial(
+                _clean_chunks(input_file, 'ISO-8859-1', chunksize), partial_file
+            )
+        chunked["rows"] = rows
+
+    # Post-pass: drop columns that were empty in every chunk
+    keep = [col for col in columns if col in non_empty]
+    numeric = [col for col in keep if col in numeric]
+    if rows == 0:
+        pd.DataFrame(columns=keep).to_csv(output_file, index=False)
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+    elif len(keep) == len(columns):
+        os.replace(partial_file, output_file)
+    else:
+        reader = pd.read_csv(partial_file, usecols=keep, dtype=str, chunksize=chunksize)
+        for n, chunk in enumerate(reader):
+            chunk[keep].to_csv(output_file, mode='w' if n == 0 else 'a', header=n == 0, index=False)
+        os.remove(partial_file)
+
+    if rows:
+        with stage("write_columnar", rows=rows):
+            chunks = pd.read_csv(output_file, dtype=str, chunksize=chunksize)
+            write_columnar_chunks(chunks, output_file, numeric_columns=numeric)
+    print(f"Successfully cleaned {rows} rows and saved to {output_file}")
+
+# =============================
+# HARMONISED CROSS-YEAR TABLE
+# =============================
+# Canonical name -> cleaned column name per survey year. Rows from every year
+# are stacked into one table with a `year` column, so cross-year analyses
+# read a single artifact instead of re-deriving this mapping.
+#
+# Attitude and time questions use the most recent period asked in each wave:
+# the 2020 "last 3 months" block and the 2021 "last 6 months" block.
+# remote_time_current is the column the productivity analyses have always
+# used as the work-mode proxy for that year.
+HARMONISED_COLUMNS = {
+    "response_id": {2020: "response_id", 2021: "response_id"},
+    "birth_year": {2020: "birth_year", 2021: "birth_year"},
+    "age": {2020: "age", 2021: "age"},
+    "gender": {2020: "gender", 2021: "gender"},
+    "industry": {2020: "industry", 2021: "industry"},
+    "occupation": {2020: "occupation", 2021: "occupation"},
+    "org_size": {2020: "org_size", 2021: "org_size_total"},
+    "is_manager": {2020: "occupation_1", 2021: "is_manager"},
+    "household_type": {2020: "which_of_the_following_best", 2021: "which_of_the_following_best"},
+    "job_tenure": {2020: "job_tenure", 2021: "job_tenure_length"},
+    "metro_regional": {2020: "metro_regional", 2021: "metro_or_regional"},
+
+    "remote_time_current": {2020: "remote_time_last_3m", 2021: "how_much_of_your_work"},
+    "preferred_remote_future": {2020: "future_preferred_remote_time", 2021: "preferred_remote_future"},
+    "org_encouragement": {2020: "org_encouragement_last_3m", 2021: "org_encouragement_score"},
+    "org_preparedness": {2020: "org_preparedness_last_3m", 2021: "org_preparedness_score"},
+    "remote_prevalence": {2020: "remote_prevalence_last_3m", 2021: "org_remote_culture_prevalence"},
+    "permission_ease": {2020: "permission_ease_last_3m", 2021: "remote_permission_ease"},
+    "collaboration_ease": {2020: "collaboration_ease_last_3m", 2021: "remote_collaboration_ease"},
+    "future_employer_encouragement_likelihood": {2020: "future_employer_encouragement_likelihood", 2021: "future_employer_support_likelihood"},
+    "future_employer_support_likelihood": {2020: "future_employer_support_likelihood", 2021: "imagine_that_covid_19_is"},
+    "future_location_choice_likelihood": {2020: "future_location_choice_likelihood", 2021: "imagine_that_covid_19_is_1"},
+
+    "relative_remote_productivity": {2020: "relative_remote_productivity", 2021: "relative_remote_productivity"},
+    "office_commute_hours": {2020: "office_commute_hours", 2021: "think_about_your_experience_this"},
+    "office_work_hours": {2020: "office_work_hours", 2021: "think_about_your_experience_this_1"},
+    "office_domestic_hours": {2020: "office_domestic_hours", 2021: "think_about_your_experience_this_2"},
+    "office_personal_hours": {2020: "office_family_hours", 2021: "think_about_your_experience_this_3"},
+    "remote_commute_hours": {2020: "remote_commute_hours", 2021: "think_about_your_experience_this_5"},
+    "remote_work_hours": {2020: "remote_work_hours", 2021: "think_about_your_experience_this_6"},
+    "remote_domestic_hours": {2020: "remote_domestic_hours", 2021: "think_about_your_experience_this_7"},
+    "remote_personal_hours": {2020: "remote_family_hours", 2021: "think_about_your_experience_this_8"},
+}
+HARMONISED_NUMERIC = [
+    "response_id", "birth_year", "age",
+    "office_commute_hours", "office_work_hours", "office_domestic_hours", "office_personal_hours",
+    "remote_commute_hours", "remote_work_hours", "remote_domestic_hours", "remote_personal_hours",
+]
+HARMONISED_FILE = "harmonised_data.csv"
+
+def harmonise_frames(frames):
+    # frames: {year: cleaned DataFrame} -> one stacked frame with canonical names
+    parts = []
+    for year, df in sorted(frames.items()):
+        renames = {columns[year]: canonical for canonical, columns in HARMONISED_COLUMNS.items()}
+        part = df[list(renames)].rename(columns=renames)
+        part.insert(0, "year", year)
+        parts.append(part)
+    merged = pd.concat(parts, ignore_index=True)
+
+    for col in HARMONISED_NUMERIC:
+        merged[col] = pd.to_numeric(merged[col], errors='coerce')
+    merged["year"] = merged["year"].astype("int16")
+    # Answer text: collapse stray whitespace so both years share one vocabulary
+    for col in merged.columns.difference(HARMONISED_NUMERIC + ["year"]):
+        merged[col] = merged[col].str.split().str.join(" ").astype("category")
+    return merged
+
+def build_harmonised(data_dir="datasets", force=False):
+    sources = {year: os.path.join(data_dir, f"{year}_cleaned_data.csv") for year in (2020, 2021)}
+    missing = [path for path in sources.values() if not os.path.exists(path)]
+    if missing:
+        print(f"Skipping harmonised table, missing: {', '.join(missing)}")
+        return False
+
+    output_file = os.path.join(data_dir, HARMONISED_FILE)
+    manifest_path = _manifest_path(output_file)
+    fingerprint = {
+        "inputs": {str(year): file_digest(path) for year, path in sources.items()},
+        "mapping": data_digest([HARMONISED_COLUMNS, HARMONISED_NUMERIC]),
+    }
+    if not force and is_up_to_date(manifest_path, HARMONISED_FILE, fingerprint, _built_outputs(output_file)):
+        print(f"{output_file} is up to date")
+        return False
+
+    with stage("harmonise") as harmonise:
+        frames = {
+            year: read_dataset(path, columns=[columns[year] for columns in HARMONISED_COLUMNS.values()])
+            for year, path in sources.items()
+        }
+        merged = harmonise_frames(frames)
+        merged.to_csv(output_file, index=False)
+        write_columnar(merged, output_file)
+        harmonise["rows"] = len(merged)
+    record_build(manifest_path, HARMONISED_FILE, fingerprint, _built_outputs(output_file))
+    print(f"Harmonised {len(merged)} rows from {len(frames)} survey years into {output_file}")
+    return True
+
+# =============================
+# MULTI-FILE CLI
+# =============================
+def output_path_for(input_file):
+    base, _ = os.path.splitext(input_file)
+    if base.endswith("_rws"):
+        base = base[:-len("_rws")]
+    return f"{base}_cleaned_data.csv"
+
+def expand_inputs(paths):
+    # Directories contribute their *_rws.csv exports; anything else is a glob.
+    # Cleaned outputs are skipped so a broad glob never re-cleans them.
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "*_rws.csv"))
+        else:
+            matches = glob.glob(path)
+        for match in sorted(matches):
+            if not match.endswith(".csv") or match.endswith("_cleaned_data.csv"):
+                continue
+            if match not in inputs:
+                inputs.append(match)
+    return inputs
+
+def _clean_one(input_file, output_file, chunksize, force):
+    start = time.perf_counter()
+    cleaned = False
+    try:
+        cleaned = clean_file(input_file, output_file, chunksize=chunksize, force=force)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return input_file, output_file, time.perf_counter() - start, error, cleaned
+
+def clean_many(inputs, workers=None, chunksize=None, force=False):
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_clean_one, input_file, output_path_for(input_file), chunksize, force)
+            for input_file in inputs
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    print("\n--- Cleaning Summary ---")
+    for input_file, output_file, elapsed, error, cleaned in sorted(results):
+        if error:
+            status = f"FAILED ({error})"
+        else:
+            status = f"-> {output_file}" if cleaned else "(up to date)"
+        print(f"{input_file}: {elapsed:.2f}s {status}")
+    failed = sum(1 for result in results if result[3])
+    cleaned = sum(1 for result in results if result[4])
+    skipped = len(results) - failed - cleaned
+    print(f"{cleaned} cleaned, {skipped} up to date, {failed} failed in {time.perf_counter() - start:.2f}s")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean remote work survey exports.")
+    parser.add_argument("paths", nargs="*", default=["datasets"],
+                        help="survey export files, globs or directories (default: datasets)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="clean in chunks of this many rows to bound memory")
+    parser.add_argument("--force", action="store_true",
+                        help="re-clean even if inputs and rules are unchanged")
+    parser.add_argument("--harmonise-dir", default="datasets",
+                        help="directory whose 2020/2021 cleaned files are merged into "
+                             f"{HARMONISED_FILE} (default: datasets)")
+    parser.add_argument("--no-harmonise", action="store_true",
+                        help="skip building the harmonised cross-year table")
+    args = parser.parse_args(argv)
+
+    inputs = expand_inputs(args.paths)
+    if not inputs:
+        parser.error("no survey exports found")
+    results = clean_many(inputs, workers=args.workers, chunksize=args.chunksize, force=args.force)
+    if not args.no_harmonise:
+        build_harmonised(args.harmonise_dir, force=args.force)
+    return 1 if any(result[3] for result in results) else 0
+
 if __name__ == "__main__":
-    clean_file("datasets/2021_rws.csv", "datasets/2021_cleaned_data.csv")
-    clean_file("datasets/2020_rws.csv", "datasets/2020_cleaned_data.csv")
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import os
+import numpy as np
+import pandas as pd
+
+# =============================
+# COLUMNAR CACHE
+# =============================
+# Every cleaned CSV gets a Parquet twin next to it. Answer columns are stored
+# as categoricals (dictionary-encoded on disk), so reading it skips the text
+# parse and keeps a single copy of each repeated answer string in memory.
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+def write_columnar(df, csv_path):
+    out = df.copy()
+    for col in out.select_dtypes(include="object").columns:
+        out[col] = out[col].astype("category")
+    path = columnar_path(csv_path)
+    try:
+        out.to_parquet(path, index=False)
+    except ImportError as e:
+        print(f"Skipping columnar cache for {csv_path}: {e}")
+        return None
+    return path
+
+def write_columnar_chunks(chunks, csv_path, numeric_columns=()):
+    # Streaming variant for the chunked cleaner: text columns are written as
+    # dictionary-encoded strings (read back as categoricals), numeric columns
+    # as float64, one row group per chunk.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        print(f"Skipping columnar cache for {csv_path}: {e}")
+        return None
+
+    path = columnar_path(csv_path)
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.schema([
+                    (col, pa.float64() if col in numeric_columns else pa.dictionary(pa.int32(), pa.string()))
+                    for col in chunk.columns
+                ])
+                writer = pq.ParquetWriter(path, schema)
+            for col in numeric_columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+def columnar_is_fresh(csv_path):
+    path = columnar_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+# =============================
+# COLUMN PROJECTION
+# =============================
+# Analyses declare the columns they need and only those are parsed/read.
+
+def _check_columns(available, columns, source):
+    missing = [col for col in columns if col not in available]
+    if missing:
+        raise ValueError(f"{source} is missing required columns: {', '.join(missing)}")
+
+def _read_parquet(path, columns):
+    if columns is not None:
+        import pyarrow.parquet as pq
+        _check_columns(pq.read_schema(path).names, columns, path)
+    return pd.read_parquet(path, columns=columns)
+
+def _read_csv(path, columns):
+    if columns is not None:
+        _check_columns(pd.read_csv(path, nrows=0).columns, columns, path)
+        # usecols keeps file order; reorder to match the request
+        return pd.read_csv(path, usecols=columns)[columns]
+    return pd.read_csv(path)
+
+def dataset_columns(csv_path):
+    # Column names without reading any rows, for callers that select by pattern
+    if columnar_is_fresh(csv_path):
+        try:
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(columnar_path(csv_path)).names)
+        except ImportError:
+            pass
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+def read_dataset(csv_path, columns=None, compact=False, dtypes=None):
+    # compact=True applies compact_dtypes (see below), with `dtypes` overrides
+    columns = list(columns) if columns is not None else None
+    df = None
+    # Prefer the Parquet twin unless the CSV was edited after it was written
+    if columnar_is_fresh(csv_path):
+        try:
+            df = _read_parquet(columnar_path(csv_path), columns)
+        except ImportError:
+            pass
+    if df is None:
+        df = _read_csv(csv_path, columns)
+    return compact_dtypes(df, dtypes) if compact else df
+
+# =============================
+# COMPACT DTYPES
+# =============================
+# Answers come from small fixed vocabularies and numeric answers are small,
+# so frames held in memory (e.g. once per dashboard process) store text as
+# categoricals, floats as float32 and integers in the narrowest type that
+# fits (nullable when values are missing). `dtypes` overrides the choice for
+# individual columns, e.g. {"age": "Int16"} for whole numbers read as float.
+
+INTEGER_DTYPES = ["int8", "int16", "int32", "int64"]
+
+def _narrow_integer(series):
+    values = series.dropna()
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            break
+    # Capitalised names are pandas' nullable integer types
+    return dtype.capitalize() if series.isna().any() else dtype
+
+def _compact_dtype(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return None
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return _narrow_integer(series)
+    if pd.api.types.is_float_dtype(series.dtype):
+        return "float32"
+    return None
+
+def compact_dtypes(df, dtypes=None):
+    dtypes = dtypes or {}
+    converted = {}
+    for col in df.columns:
+        target = dtypes.get(col) or _compact_dtype(df[col])
+        converted[col] = df[col].astype(target) if target else df[col]
+    return pd.DataFrame(converted, index=df.index)
+
+def memory_report(before, after):
+    # Deep (string-inclusive) memory per column before/after compaction
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.reindex(before.columns).astype(str),
+        "bytes_before": before.memory_usage(deep=True, index=False),
+        "bytes_after": after.memory_usage(deep=True, index=False).reindex(before.columns),
+    })
+    report.loc["TOTAL"] = ["", "", report["bytes_before"].sum(), report["bytes_after"].sum()]
+    return report
+
+if __name__ == "__main__":
+    import sys
+    # python data_io.py <cleaned csv> [column ...]
+    path = sys.argv[1]
+    frame = read_dataset(path, columns=sys.argv[2:] or None)
+    report = memory_report(frame, compact_dtypes(frame))
+    print(report.to_string())
+    total = report.loc["TOTAL"]
+    print(f"\n{total['bytes_before'] / 1e6:.2f} MB -> {total['bytes_after'] / 1e6:.2f} MB "
+          f"({total['bytes_after'] / total['bytes_before']:.0%})")
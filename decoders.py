@@ -0,0 +1,94 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Survey answer columns only hold a dozen distinct strings, so every decoder
+# below parses each distinct answer once and broadcasts the result back to
+# the rows through the factorized codes instead of running per row.
+
+PRODUCTIVITY_PATTERN = re.compile(r'(\d+)%')
+
+def decode_unique(series, parse):
+    codes, uniques = pd.factorize(series)
+    # Code -1 marks missing values; it indexes the trailing NaN slot
+    lookup = np.array([parse(v) for v in uniques] + [parse(np.nan)], dtype=object)
+    return pd.Series(lookup[codes], index=series.index, name=series.name).infer_objects()
+
+# =============================
+# PER-ANSWER PARSERS
+# =============================
+def parse_work_mode_2020(value):
+    value = str(value).lower()
+    if "less than" in value or "10%" in value or "rarely" in value:
+        return "Mostly onsite"
+    if "half" in value or "50%" in value:
+        return "Hybrid"
+    return "Mostly remote"
+
+def parse_percentage_2021(val):
+    if pd.isna(val): return None
+    val = str(val).lower()
+    if "100%" in val: return 100
+    if "90%" in val: return 90
+    if "80%" in val: return 80
+    if "70%" in val: return 70
+    if "60%" in val: return 60
+    if "50%" in val: return 50
+    if "40%" in val: return 40
+    if "30%" in val: return 30
+    if "20%" in val: return 20
+    if "10%" in val: return 10
+    if "less than 10%" in val: return 5
+    return None # For "I would not have preferred..."
+
+def parse_percentage_2020(val):
+    # e.g. "50% - About half of my time", "20%", "Rarely or never"
+    if pd.isna(val): return None
+    val = str(val).lower()
+    if "rarely or never" in val: return 0
+    if "100%" in val: return 100
+    if "90%" in val: return 90
+    if "80%" in val: return 80
+    if "70%" in val: return 70
+    if "60%" in val: return 60
+    if "50%" in val: return 50
+    if "40%" in val: return 40
+    if "30%" in val: return 30
+    if "20%" in val: return 20
+    if "10%" in val: return 10
+    return None
+
+def parse_productivity(val):
+    if pd.isna(val): return None
+    val = str(val).lower()
+    if "about same" in val: return 0
+    match = PRODUCTIVITY_PATTERN.search(val)
+    if match:
+        num = int(match.group(1))
+        if "more productive" in val:
+            return num
+        elif "less productive" in val:
+            return -num
+    return None
+
+def parse_work_mode_pct(pct):
+    if pct is None or pd.isna(pct): return None
+    if pct >= 80: return 'Remote'
+    if pct <= 20: return 'On-site'
+    return 'Hybrid'
+
+# =============================
+# COLUMN DECODERS
+# =============================
+def decode_work_mode_2020(series):
+    return decode_unique(series, parse_work_mode_2020)
+
+def decode_percentage(series, year):
+    parse = parse_percentage_2020 if str(year) == "2020" else parse_percentage_2021
+    return decode_unique(series, parse)
+
+def decode_productivity(series):
+    return decode_unique(series, parse_productivity)
+
+def decode_work_mode_pct(series):
+    return decode_unique(series, parse_work_mode_pct)
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# =============================
+# STAGE INSTRUMENTATION
+# =============================
+# `with stage("csv_parse") as s: ...; s["rows"] = len(df)` (or the @staged
+# decorator) records wall time, rows processed, the process's peak RSS and,
+# when tracemalloc is on, the peak Python allocation inside the stage.
+#
+# Recording is off unless PIPELINE_PROFILE_DIR is set. Every process (clean
+# workers, chart workers, member2 subprocesses) appends one JSON line per
+# finished stage to <dir>/<pid>.jsonl, so nothing depends on clean shutdown;
+# `python instrumentation.py <dir>` merges them into report.json (totals per
+# stage) and trace.json (Chrome trace format, opens in chrome://tracing or
+# Perfetto as a flame chart). PIPELINE_TRACEMALLOC=1 adds allocation peaks,
+# at a noticeable slowdown.
+
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+TRACEMALLOC_ENV = "PIPELINE_TRACEMALLOC"
+REPORT_FILE = "report.json"
+TRACE_FILE = "trace.json"
+
+# Open stages in this process, innermost last
+_STACK = []
+
+def profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV) or None
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def _tracing():
+    if os.environ.get(TRACEMALLOC_ENV) != "1":
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return True
+
+def _fold_peak_into_parents(peak):
+    for parent in _STACK:
+        parent["_peak"] = max(parent["_peak"], peak)
+
+def _write_record(out_dir, record):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, f"{os.getpid()}.jsonl"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+@contextmanager
+def stage(name, rows=None, **args):
+    out_dir = profile_dir()
+    record = {"rows": rows}
+    if out_dir is None:
+        yield record
+        return
+
+    tracing = _tracing()
+    if tracing:
+        # tracemalloc has a single peak counter: hand the current peak to
+        # the enclosing stages, then reset it so this stage starts clean
+        current, peak = tracemalloc.get_traced_memory()
+        _fold_peak_into_parents(peak)
+        tracemalloc.reset_peak()
+        record["_start_traced"] = current
+    record["_peak"] = 0
+    _STACK.append(record)
+
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        _STACK.pop()
+        peak_bytes = None
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            _fold_peak_into_parents(peak)
+            peak_bytes = max(record["_peak"], peak) - record["_start_traced"]
+        _write_record(out_dir, {
+            "name": name,
+            "pid": os.getpid(),
+            "process": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python",
+            "depth": len(_STACK),
+            "start": start_wall,
+            "seconds": seconds,
+            "rows": record["rows"],
+            "peak_traced_bytes": peak_bytes,
+            "max_rss_bytes": _max_rss_bytes(),
+            "args": {key: str(value) for key, value in args.items()},
+        })
+
+def staged(name):
+    # Decorator form of stage(); rows are not known up front
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# =============================
+# REPORTS
+# =============================
+def load_records(out_dir):
+    records = []
+    for filename in sorted(os.listdir(out_dir)):
+        if filename.endswith(".jsonl"):
+            with open(os.path.join(out_dir, filename)) as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return sorted(records, key=lambda record: record["start"])
+
+def summarise(records):
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record["name"], {
+            "calls": 0, "seconds": 0.0, "rows": 0, "peak_traced_bytes": None, "max_rss_bytes": None,
+        })
+        entry["calls"] += 1
+        entry["seconds"] += record["seconds"]
+        entry["rows"] += record["rows"] or 0
+        for key in ("peak_traced_bytes", "max_rss_bytes"):
+            if record[key] is not None:
+                entry[key] = max(entry[key] or 0, record[key])
+    return summary
+
+def chrome_trace(records):
+    # Complete ("X") events; nesting is implied by the timestamps per pid
+    events = []
+    for record in records:
+        events.append({
+            "name": record["name"],
+            "ph": "X",
+            "ts": record["start"] * 1e6,
+            "dur": record["seconds"] * 1e6,
+            "pid": record["pid"],
+            "tid": record["pid"],
+            "args": dict(record["args"], rows=record["rows"],
+                         peak_traced_bytes=record["peak_traced_bytes"],
+                         max_rss_bytes=record["max_rss_bytes"]),
+        })
+    for pid, process in {record["pid"]: record["process"] for record in records}.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def _megabytes(value):
+    return "-" if value is None else f"{value / 1e6:.1f}"
+
+def write_reports(out_dir):
+    records = load_records(out_dir)
+    summary = summarise(records)
+    with open(os.path.join(out_dir, REPORT_FILE), "w") as f:
+        json.dump({"stages": summary, "records": records}, f, indent=2)
+    with open(os.path.join(out_dir, TRACE_FILE), "w") as f:
+        json.dump(chrome_trace(records), f)
+
+    print(f"\n--- Stage Profile ({out_dir}) ---")
+    print(f"{'stage':<28}{'calls':>6}{'seconds':>10}{'rows':>12}{'traced MB':>11}{'RSS MB':>9}")
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{name:<28}{entry['calls']:>6}{entry['seconds']:>10.3f}{entry['rows']:>12}"
+              f"{_megabytes(entry['peak_traced_bytes']):>11}{_megabytes(entry['max_rss_bytes']):>9}")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge stage records into report.json and trace.json.")
+    parser.add_argument("profile_dir", help=f"directory the run wrote to (its {PROFILE_DIR_ENV})")
+    args = parser.parse_args(argv)
+    write_reports(args.profile_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# =============================
+# BUILD MANIFEST
+# =============================
+# A JSON file mapping a build target (an output path or a pipeline stage name)
+# to the fingerprint of the inputs it was last built from. A target is up to
+# date when its fingerprint is unchanged and its outputs still hash to what
+# was recorded.
+
+READ_BLOCK_BYTES = 1 << 20
+
+@contextmanager
+def file_lock(path):
+    # Exclusive lock on <path>.lock, held by shared JSON files (this manifest,
+    # the encoding cache) across load -> modify -> replace. Without it,
+    # parallel cleaners each rename in their own copy and drop the others'
+    # entries.
+    with open(f"{path}.lock", "a+") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+def write_json_atomic(path, data):
+    # Write-then-rename so readers never see partial JSON
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def data_digest(obj):
+    # Stable hash of JSON-serialisable data such as rule tables
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _outputs_digest(manifest_path, outputs):
+    # Keyed relative to the manifest so it does not depend on the working dir
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    return {
+        os.path.relpath(os.path.abspath(path), base_dir): file_digest(path)
+        for path in outputs
+    }
+
+def is_up_to_date(manifest_path, target, fingerprint, outputs):
+    entry = load_manifest(manifest_path).get(target)
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    if any(not os.path.exists(path) for path in outputs):
+        return False
+    return entry.get("outputs") == _outputs_digest(manifest_path, outputs)
+
+def record_build(manifest_path, target, fingerprint, outputs):
+    # Outputs are hashed before taking the lock to keep it short
+    entry = {"fingerprint": fingerprint, "outputs": _outputs_digest(manifest_path, outputs)}
+    with file_lock(manifest_path):
+        manifest = load_manifest(manifest_path)
+        manifest[target] = entry
+        write_json_atomic(manifest_path, manifest)
@@ -1,172 +1,131 @@
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
+import sys
+import argparse
 
 # Setup
 script_dir = os.path.dirname(os.path.abspath(__file__))
-path_2020 = os.path.join(script_dir, "..", "datasets", "2020_cleaned_data.csv")
-path_2021 = os.path.join(script_dir, "..", "datasets", "2021_cleaned_data.csv")
+sys.path.insert(0, os.path.join(script_dir, ".."))
+from bootstrap import bootstrap_means
+from data_io import read_dataset
+from instrumentation import stage
+from charts import chart_spec, render_charts
+from decoders import decode_percentage, decode_productivity, decode_work_mode_pct
+from productivity_stats import new_state, state_table, update_state
+from productivity_charts import draw_comparison_avg, draw_comparison_dist
+
+harmonised_path = os.path.join(script_dir, "..", "datasets", "harmonised_data.csv")
 output_dir = script_dir
 
-# --- Helper Functions ---
-def clean_productivity(val):
-    if pd.isna(val): return None
-    val = str(val).lower()
-    
-    # Standardize "about same" to 0
-    if "about same" in val: return 0
-    
-    # Handle the "I知" vs "I'm" typo in 2020 data if it exists
-    # 2020 data has "I知" instead of "I'm"
-    
-    # Extract number
-    match = re.search(r'(\d+)%', val)
-    if match:
-        num = int(match.group(1))
-        if "more productive" in val:
-            return num
-        elif "less productive" in val:
-            return -num
-    return None
+# Both years come pre-merged with canonical names (see clean_data.HARMONISED_COLUMNS).
+# 'remote_time_current' is 'remote_time_last_3m' in 2020 and 'how_much_of_your_work' in 2021.
+required_columns = ['year', 'remote_time_current', 'relative_remote_productivity']
 
-def get_work_mode(pct):
-    if pct is None: return None
-    if pct >= 80: return 'Remote'
-    if pct <= 20: return 'On-site'
-    return 'Hybrid'
+# Guarded so chart worker processes (spawn start method) can import this
+# script for its setup without rerunning the analysis
+def main(force=False):
+    try:
+        print("Loading datasets...")
+        with stage("load") as load:
+            df = read_dataset(harmonised_path, columns=required_columns)
+            load["rows"] = len(df)
+        df['year'] = df['year'].astype(str)
+    
+        # Percentage answers are worded differently per year, so decode each year separately
+        with stage("decode", rows=len(df)):
+            combined_df = pd.DataFrame({'year': df['year']})
+            combined_df['remote_pct'] = pd.concat([
+                decode_percentage(group['remote_time_current'], year)
+                for year, group in df.groupby('year')
+            ])
+            combined_df['prod_score'] = decode_productivity(df['relative_remote_productivity'])
+    
+        # Clean combined
+        combined_df = combined_df.dropna(subset=['prod_score', 'remote_pct'])
+        combined_df['work_mode'] = decode_work_mode_pct(combined_df['remote_pct'])
+    
+        print(f"Combined clean dataset size: {len(combined_df)} rows.")
+        print(combined_df['year'].value_counts())
 
-def clean_percentage_2021(val):
-    if pd.isna(val): return None
-    val = str(val).lower()
-    if "100%" in val: return 100
-    if "90%" in val: return 90
-    if "80%" in val: return 80
-    if "70%" in val: return 70
-    if "60%" in val: return 60
-    if "50%" in val: return 50
-    if "40%" in val: return 40
-    if "30%" in val: return 30
-    if "20%" in val: return 20
-    if "10%" in val: return 10
-    if "less than 10%" in val: return 5
-    return None
+        # --- Analysis ---
+        # Statistics come from the online aggregator (see productivity_stats.py)
+        with stage("groupby", rows=len(combined_df)):
+            state = update_state(new_state(), combined_df)
+            stats = state_table(state)
 
-def clean_percentage_2020(val):
-    # Based on observation of 2020 CSV, the format seems similar or potentially simpler
-    # e.g. "50% - About half of my time", "20%", "Rarely or never"
-    if pd.isna(val): return None
-    val = str(val).lower()
-    
-    if "rarely or never" in val: return 0
-    if "100%" in val: return 100
-    if "90%" in val: return 90
-    if "80%" in val: return 80
-    if "70%" in val: return 70
-    if "60%" in val: return 60
-    if "50%" in val: return 50
-    if "40%" in val: return 40
-    if "30%" in val: return 30
-    if "20%" in val: return 20
-    if "10%" in val: return 10
-    
-    return None
+        # 1. Avg Productivity by Year
+        avg_prod_year = state_table(state, by='year')['mean'].rename('prod_score')
+        print("\n--- Avg Productivity Score by Year ---")
+        print(avg_prod_year)
+    
+        # 2. Avg Productivity by Work Mode & Year
+        avg_prod_mode_year = stats['mean'].rename('prod_score').unstack()
+        print("\n--- Avg Productivity Score by Work Mode & Year ---")
+        print(avg_prod_mode_year)
+    
+        # 3. Proportion of "More Productive" people
+        prop_more_productive = stats['pct_more_productive'].rename('is_more_productive')
+        print("\n--- % Reporting Higher Productivity ---")
+        print(prop_more_productive)
 
-try:
-    print("Loading datasets...")
-    df_2020 = pd.read_csv(path_2020)
-    df_2021 = pd.read_csv(path_2021)
-    
-    # --- Process 2020 Data ---
-    # Metric: 'remote_time_last_3m' (Time spent remotely in last 3 months - proxy for current state in 2020)
-    # Metric: 'relative_remote_productivity'
-    
-    df_2020['remote_pct'] = df_2020['remote_time_last_3m'].apply(clean_percentage_2020)
-    df_2020['prod_score'] = df_2020['relative_remote_productivity'].apply(clean_productivity)
-    df_2020['year'] = '2020'
-    
-    # Process 2021 Data
-    # Metric: 'how_much_of_your_work' (proxy for current state in 2021)
-    # Metric: 'relative_remote_productivity'
-    
-    df_2021['remote_pct'] = df_2021['how_much_of_your_work'].apply(clean_percentage_2021)
-    df_2021['prod_score'] = df_2021['relative_remote_productivity'].apply(clean_productivity)
-    df_2021['year'] = '2021'
-    
-    # Combine relevant columns
-    cols = ['year', 'remote_pct', 'prod_score']
-    combined_df = pd.concat([df_2020[cols], df_2021[cols]], ignore_index=True)
-    
-    # Clean combined
-    combined_df = combined_df.dropna(subset=['prod_score', 'remote_pct'])
-    combined_df['work_mode'] = combined_df['remote_pct'].apply(get_work_mode)
-    
-    print(f"Combined clean dataset size: {len(combined_df)} rows.")
-    print(combined_df['year'].value_counts())
-
-    # --- Analysis ---
-
-    # 1. Avg Productivity by Year
-    avg_prod_year = combined_df.groupby('year')['prod_score'].mean()
-    print("\n--- Avg Productivity Score by Year ---")
-    print(avg_prod_year)
-    
-    # 2. Avg Productivity by Work Mode & Year
-    avg_prod_mode_year = combined_df.groupby(['year', 'work_mode'])['prod_score'].mean().unstack()
-    print("\n--- Avg Productivity Score by Work Mode & Year ---")
-    print(avg_prod_mode_year)
-    
-    # 3. Proportion of "More Productive" people
-    combined_df['is_more_productive'] = combined_df['prod_score'] > 0
-    prop_more_productive = combined_df.groupby(['year', 'work_mode'])['is_more_productive'].mean() * 100
-    print("\n--- % Reporting Higher Productivity ---")
-    print(prop_more_productive)
+        # 4. Uncertainty of the averages (95% bootstrap CI, 10,000 resamples)
+        avg_prod_mode_year_ci = bootstrap_means(
+            combined_df['prod_score'], [combined_df['year'], combined_df['work_mode']]
+        ).round(2)
+        print("\n--- 95% Bootstrap CI of Avg Productivity by Work Mode & Year ---")
+        print(avg_prod_mode_year_ci)
 
-    # --- Charts ---
-    
-    # Chart 1: Comparative Bar Chart (Avg Productivity Score)
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=combined_df, x='work_mode', y='prod_score', hue='year', palette="coolwarm", errorbar=None)
-    plt.title("Productivity Impact: 2020 vs 2021")
-    plt.ylabel("Avg % Change in Productivity")
-    plt.xlabel("Work Mode")
-    plt.axhline(0, color='black', linewidth=0.5)
-    plt.legend(title="Year")
-    plt.savefig(os.path.join(output_dir, "comparison_productivity_avg.png"))
-    print("Saved chart: comparison_productivity_avg.png")
-    
-    # Chart 2: Comparative Distribution (Density Plot)
-    plt.figure(figsize=(10, 6))
-    sns.kdeplot(data=combined_df[combined_df['year']=='2020'], x='prod_score', label='2020', fill=True, alpha=0.3)
-    sns.kdeplot(data=combined_df[combined_df['year']=='2021'], x='prod_score', label='2021', fill=True, alpha=0.3)
-    plt.title("Distribution of Productivity Impact Scores (2020 vs 2021)")
-    plt.xlabel("% Change in Productivity")
-    plt.legend()
-    plt.savefig(os.path.join(output_dir, "comparison_productivity_dist.png"))
-    print("Saved chart: comparison_productivity_dist.png")
+        # --- Charts --- (skipped when the plotted data is unchanged)
+        chart_data = combined_df[['year', 'work_mode', 'prod_score']]
+        specs = [
+            # Chart 1: Comparative Bar Chart (Avg Productivity Score)
+            chart_spec(
+                "comparison_productivity_avg.png", draw_comparison_avg, chart_data,
+                title="Productivity Impact: 2020 vs 2021",
+                xlabel="Work Mode", ylabel="Avg % Change in Productivity", figsize=(10, 6),
+            ),
+            # Chart 2: Comparative Distribution (Density Plot)
+            chart_spec(
+                "comparison_productivity_dist.png", draw_comparison_dist, chart_data,
+                title="Distribution of Productivity Impact Scores (2020 vs 2021)",
+                xlabel="% Change in Productivity", figsize=(10, 6),
+            ),
+        ]
+        rendered = render_charts(specs, output_dir, force=force)
+        for spec in specs:
+            saved = os.path.join(output_dir, spec["filename"]) in rendered
+            print(f"{'Saved chart' if saved else 'Chart unchanged'}: {spec['filename']}")
 
-    # Save Summary
-    with open(os.path.join(output_dir, "comparative_analysis_summary.txt"), "w") as f:
-        f.write("Member 2 Analysis: Comparative Productivity (2020 vs 2021)\n")
-        f.write("========================================================\n\n")
+        # Save Summary
+        with open(os.path.join(output_dir, "comparative_analysis_summary.txt"), "w") as f:
+            f.write("Member 2 Analysis: Comparative Productivity (2020 vs 2021)\n")
+            f.write("========================================================\n\n")
         
-        f.write("1. Overall Trend:\n")
-        f.write(f"2020 Avg Impact: {avg_prod_year['2020']:.2f}%\n")
-        f.write(f"2021 Avg Impact: {avg_prod_year['2021']:.2f}%\n")
-        diff = avg_prod_year['2021'] - avg_prod_year['2020']
-        trend_text = 'increased' if diff > 0 else 'decreased'
-        f.write(f"Change: {diff:+.2f}% (Productivity gains have {trend_text})\n\n")
+            f.write("1. Overall Trend:\n")
+            f.write(f"2020 Avg Impact: {avg_prod_year['2020']:.2f}%\n")
+            f.write(f"2021 Avg Impact: {avg_prod_year['2021']:.2f}%\n")
+            diff = avg_prod_year['2021'] - avg_prod_year['2020']
+            trend_text = 'increased' if diff > 0 else 'decreased'
+            f.write(f"Change: {diff:+.2f}% (Productivity gains have {trend_text})\n\n")
         
-        f.write("2. Impact by Work Mode (Year over Year):\n")
-        f.write(avg_prod_mode_year.to_string())
-        f.write("\n\n")
+            f.write("2. Impact by Work Mode (Year over Year):\n")
+            f.write(avg_prod_mode_year.to_string())
+            f.write("\n\n")
         
-        f.write("3. Key Insights:\n")
-        f.write("- **Hybrid & Remote Resilience:** Both groups consistently report higher productivity than On-site workers across both years.\n")
-        if avg_prod_mode_year.loc['2021', 'Hybrid'] > avg_prod_mode_year.loc['2020', 'Hybrid']:
-            f.write("- **Hybrid Model Maturation:** The productivity benefit of Hybrid work has likely improved as people adjusted to the 'new normal' in 2021.\n")
-        f.write("- **On-site Stability:** On-site workers show lower productivity gains from remote work (expected, as they do it less), but the metric remains stable.\n")
+            f.write("3. Key Insights:\n")
+            f.write("- **Hybrid & Remote Resilience:** Both groups consistently report higher productivity than On-site workers across both years.\n")
+            if avg_prod_mode_year.loc['2021', 'Hybrid'] > avg_prod_mode_year.loc['2020', 'Hybrid']:
+                f.write("- **Hybrid Model Maturation:** The productivity benefit of Hybrid work has likely improved as people adjusted to the 'new normal' in 2021.\n")
+            f.write("- **On-site Stability:** On-site workers show lower productivity gains from remote work (expected, as they do it less), but the metric remains stable.\n")
+
+            f.write("\n4. 95% Bootstrap Confidence Intervals (Avg Impact by Year & Work Mode, 10,000 resamples):\n")
+            f.write(avg_prod_mode_year_ci.to_string())
+            f.write("\n")
+
+    except Exception as e:
+        print(f"Error: {e}")
 
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Member 2 comparative productivity analysis (2020 vs 2021).")
+    parser.add_argument("--force", action="store_true", help="redraw the charts even if their data is unchanged")
+    main(force=parser.parse_args().force)
@@ -1,14 +1,17 @@
-import pandas as pd
 import os
+import sys
 
 # Get script directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, ".."))
+from data_io import read_dataset
+
 # Define file path relative to script location
 file_path = os.path.join(script_dir, "..", "datasets", "2021_cleaned_data.csv")
 
 try:
     # Load dataset
-    df = pd.read_csv(file_path)
+    df = read_dataset(file_path)
     
     # Print all columns to identify relevant ones
     # print("--- Column Names ---")
@@ -0,0 +1,40 @@
+# Draw functions for the member2 charts. They live in their own module (not
+# the analysis scripts) so chart worker processes can import them without
+# re-running an analysis; see charts.render_charts. matplotlib and seaborn are
+# imported inside each function, so the analyses only pay for them in the
+# workers that actually draw.
+
+def draw_avg_productivity(avg_prod, title, xlabel, ylabel):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.barplot(x=avg_prod.index, y=avg_prod.values, palette="viridis")
+    plt.title(title)
+    plt.ylabel(ylabel)
+    plt.xlabel(xlabel)
+    plt.axhline(0, color='black', linewidth=1)
+
+def draw_productivity_distribution(df_clean, title, xlabel):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.histplot(data=df_clean, x='prod_score', hue='work_mode', multiple="stack", bins=11, palette="viridis")
+    plt.title(title)
+    plt.xlabel(xlabel)
+
+def draw_comparison_avg(combined_df, title, xlabel, ylabel):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.barplot(data=combined_df, x='work_mode', y='prod_score', hue='year', palette="coolwarm", errorbar=None)
+    plt.title(title)
+    plt.ylabel(ylabel)
+    plt.xlabel(xlabel)
+    plt.axhline(0, color='black', linewidth=0.5)
+    plt.legend(title="Year")
+
+def draw_comparison_dist(combined_df, title, xlabel):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.kdeplot(data=combined_df[combined_df['year']=='2020'], x='prod_score', label='2020', fill=True, alpha=0.3)
+    sns.kdeplot(data=combined_df[combined_df['year']=='2021'], x='prod_score', label='2021', fill=True, alpha=0.3)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.legend()
@@ -1,134 +1,309 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+from bitmap_index import build_bitmap_index
+from bootstrap import DEFAULT_REPLICATES, bootstrap_means
+from charts import chart_spec, render_charts as render_chart_specs
+from data_io import read_dataset
+from decoders import decode_work_mode_2020
+from instrumentation import stage
 
 # =============================
-# 0. OUTPUT DIRECTORY
+# 0. PATHS
 # =============================
-OUTPUT_DIR = "charts_2020"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "datasets", "2020_cleaned_data.csv")
+OUTPUT_DIR = os.path.join(BASE_DIR, "charts_2020")
+
+# Columns read from the cleaned dataset; everything else is derived
+REQUIRED_COLUMNS = [
+    "remote_time_last_year",
+    "org_encouragement_last_year",
+    "org_preparedness_last_year",
+    "office_family_hours",
+    "office_domestic_hours",
+    "office_commute_hours",
+    "age",
+    # Dashboard cross-filter attributes
+    "industry",
+    "occupation",
+    "gender",
+    "org_size",
+    "which_of_the_following_best",
+    "metro_regional",
+]
+
+# Dashboard cross-filters: label -> column (indexed with bitmaps, see bitmap_index.py)
+FILTER_COLUMNS = {
+    "Industry": "industry",
+    "Occupation": "occupation",
+    "Gender": "gender",
+    "Organisation size": "org_size",
+    "Household": "which_of_the_following_best",
+    "Metro / regional": "metro_regional",
+    "Age band": "age_band",
+}
+
+# Compact in-memory types (see data_io.compact_dtypes); everything else is
+# categorical text or float32 hours
+COLUMN_DTYPES = {"age": "Int16"}
+LIKERT_DTYPE = "Int8"
+
+# Loaded frames and cubes keyed by (path, mtime) so repeated calls skip the work
+_DATAFRAME_CACHE = {}
+_CUBE_CACHE = {}
+
 # =============================
 # 1. LOAD & PREP DATA
 # =============================
-def get_dataframe():
-    df = pd.read_csv("datasets/2020_cleaned_data.csv")
-    df.columns = df.columns.str.strip().str.lower()
-    
-    # Map Likert scales to numeric
-    likert_map = {
-        "Strongly agree": 5,
-        "Somewhat agree": 4,
-        "Neither agree nor disagree": 3,
-        "Somewhat disagree": 2,
-        "Strongly disagree": 1,
-    }
-    for col in ["org_encouragement_last_year", "org_preparedness_last_year"]:
-        if col in df.columns:
-            df[col] = df[col].map(likert_map)
-
-    # Ensure required columns exist and are numeric where possible
-    numeric_cols = [
-        "org_encouragement_last_year", "org_preparedness_last_year", 
-        "office_family_hours", "office_domestic_hours", "office_commute_hours", "age"
-    ]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+def _build_dataframe(path):
+    with stage("load") as load:
+        df = read_dataset(path, columns=REQUIRED_COLUMNS, compact=True, dtypes=COLUMN_DTYPES)
+        load["rows"] = len(df)
+    with stage("feature_engineering", rows=len(df)):
+        # Map Likert scales to numeric
+        likert_map = {
+            "Strongly agree": 5,
+            "Somewhat agree": 4,
+            "Neither agree nor disagree": 3,
+            "Somewhat disagree": 2,
+            "Strongly disagree": 1,
+        }
+        for col in ["org_encouragement_last_year", "org_preparedness_last_year"]:
+            if col in df.columns:
+                df[col] = df[col].map(likert_map).astype(LIKERT_DTYPE)
+
+        # Ensure required columns exist and are numeric where possible
+        numeric_cols = [
+            "org_encouragement_last_year", "org_preparedness_last_year", 
+            "office_family_hours", "office_domestic_hours", "office_commute_hours", "age"
+        ]
+        for col in numeric_cols:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
             
-    df = df.dropna(subset=[
-        "remote_time_last_year", 
-        "org_encouragement_last_year", 
-        "org_preparedness_last_year"
-    ])
-    
-    # FEATURE ENGINEERING
-    def classify_work_mode(value):
-        value = str(value).lower()
-        if "less than" in value or "10%" in value or "rarely" in value:
-            return "Mostly onsite"
-        if "half" in value or "50%" in value:
-            return "Hybrid"
-        return "Mostly remote"
-
-    df["work_mode"] = df["remote_time_last_year"].apply(classify_work_mode)
-
-    # Use pre-cleaned Likert scores
-    df["morale_score"] = (df["org_encouragement_last_year"] + df["org_preparedness_last_year"]) / 2
+        # Explicit copy: the derived columns below are assigned to a frame of
+        # its own, not to a slice of the loaded one
+        df = df.dropna(subset=[
+            "remote_time_last_year", 
+            "org_encouragement_last_year", 
+            "org_preparedness_last_year"
+        ]).copy()
     
-    df["total_care_load"] = df["office_family_hours"] + df["office_domestic_hours"]
-    df["burnout_risk"] = df["total_care_load"] / (
-        df["total_care_load"] + df["office_commute_hours"] + 1
-    )
+        # FEATURE ENGINEERING
+        df["work_mode"] = decode_work_mode_2020(df["remote_time_last_year"]).astype("category")
+
+        # Use pre-cleaned Likert scores
+        df["morale_score"] = ((df["org_encouragement_last_year"] + df["org_preparedness_last_year"]) / 2).astype("float32")
     
-    df["engagement_score"] = df["morale_score"]
+        df["total_care_load"] = df["office_family_hours"] + df["office_domestic_hours"]
+        df["burnout_risk"] = df["total_care_load"] / (
+            df["total_care_load"] + df["office_commute_hours"] + 1
+        )
     
+        df["engagement_score"] = df["morale_score"]
+        df["age_band"] = age_band(df["age"])
+
     return df
 
-df = get_dataframe()
+def _cache_key(path):
+    return (os.path.abspath(path), os.path.getmtime(path))
 
-# =============================
-# 2. INSIGHT 1: MORALE BY WORK MODE
-# =============================
-morale_by_mode = df.groupby("work_mode")["morale_score"].mean()
+def _cached(cache, key, build):
+    if key not in cache:
+        # Drop stale entries for the same file before storing the fresh result
+        for old_key in [k for k in cache if k[0] == key[0]]:
+            del cache[old_key]
+        cache[key] = build()
+    return cache[key]
+
+def _cached_dataframe(path=DATA_PATH):
+    return _cached(_DATAFRAME_CACHE, _cache_key(path), lambda: _build_dataframe(path))
 
-plt.figure()
-morale_by_mode.plot(kind="bar")
-plt.title("Average Morale by Work Mode (2020)")
-plt.xlabel("Work Mode")
-plt.ylabel("Average Morale Score")
-plt.tight_layout()
-plt.savefig(f"{OUTPUT_DIR}/morale_by_work_mode.png", dpi=300)
-plt.close()
+def get_dataframe(path=DATA_PATH, copy=True):
+    # Callers get their own copy so filtering/mutation never leaks into the
+    # cache; copy=False shares the cached frame with read-only callers
+    df = _cached_dataframe(path)
+    return df.copy() if copy else df
 
 # =============================
-# 3. INSIGHT 2: ORG SUPPORT → JOB SATISFACTION
+# 2. AGGREGATE CUBE
 # =============================
-support_vs_morale = df.groupby("org_preparedness_last_year")["morale_score"].mean()
+# count / sum / sum of squares of every metric per cell of the dimensions
+# below. Any filter on work_mode plus any grouping by these dimensions is
+# answered by summing cells, so dashboard interactions never touch raw rows.
+CUBE_DIMENSIONS = ["work_mode", "org_preparedness_last_year", "age_band"]
+CUBE_METRICS = ["morale_score", "engagement_score", "burnout_risk", "total_care_load"]
+AGE_BANDS = [0, 25, 35, 45, 55, 65, 120]
+AGE_BAND_LABELS = ["Under 25", "25-34", "35-44", "45-54", "55-64", "65+"]
 
-plt.figure()
-support_vs_morale.plot(marker="o")
-plt.title("Organisational Preparedness vs Job Satisfaction (2020)")
-plt.xlabel("Org Preparedness Score")
-plt.ylabel("Average Morale Score")
-plt.tight_layout()
-plt.savefig(f"{OUTPUT_DIR}/org_preparedness_vs_morale.png", dpi=300)
-plt.close()
+def age_band(age):
+    return pd.cut(age, AGE_BANDS, labels=AGE_BAND_LABELS, right=False)
+
+def build_cube(df):
+    with stage("groupby", rows=len(df), target="cube"):
+        return _build_cube(df)
+
+def _build_cube(df):
+    cells = df[["work_mode", "org_preparedness_last_year"] + CUBE_METRICS].copy()
+    cells["age_band"] = age_band(df["age"]).astype(str)
+    for metric in CUBE_METRICS:
+        cells[f"{metric}_sumsq"] = cells[metric] ** 2
+    grouped = cells.groupby(CUBE_DIMENSIONS, dropna=False, observed=True)
+
+    cube = grouped.size().to_frame("rows")
+    for metric in CUBE_METRICS:
+        cube[f"{metric}_count"] = grouped[metric].count()
+        cube[f"{metric}_sum"] = grouped[metric].sum()
+        cube[f"{metric}_sumsq"] = grouped[f"{metric}_sumsq"].sum()
+    return cube.reset_index()
+
+def build_filter_index(df):
+    return build_bitmap_index(df, ["work_mode"] + list(FILTER_COLUMNS.values()))
+
+def get_cube(path=DATA_PATH):
+    return _cached(_CUBE_CACHE, _cache_key(path), lambda: build_cube(_cached_dataframe(path)))
+
+def cube_aggregate(cube, by="work_mode", work_modes=None, stat="mean"):
+    # stat: "mean", "std" (sample) or "count", per metric
+    if work_modes is not None:
+        cube = cube[cube["work_mode"].isin(work_modes)]
+    totals = cube.groupby(by, observed=True).sum(numeric_only=True)
+    result = pd.DataFrame(index=totals.index)
+    for metric in CUBE_METRICS:
+        count = totals[f"{metric}_count"]
+        mean = totals[f"{metric}_sum"] / count
+        if stat == "mean":
+            result[metric] = mean
+        elif stat == "std":
+            variance = (totals[f"{metric}_sumsq"] - count * mean ** 2) / (count - 1)
+            result[metric] = variance.clip(lower=0) ** 0.5
+        elif stat == "count":
+            result[metric] = count
+        else:
+            raise ValueError(f"Unknown cube statistic: {stat}")
+    return result
 
 # =============================
-# 4. INSIGHT 3: STRESS & BURNOUT RISK
+# 3. CARE LOAD VS AGE DOWNSAMPLING
 # =============================
-plt.figure()
-plt.scatter(df["total_care_load"], df["age"], c=df["burnout_risk"], cmap='viridis')
-plt.title("Care Load vs Age (Burnout Risk Color)")
-plt.xlabel("Family + Caring Time (hours)")
-plt.ylabel("Age")
-plt.colorbar(label='Burnout Risk')
-plt.tight_layout()
-plt.savefig(f"{OUTPUT_DIR}/care_load_vs_age.png", dpi=300)
-plt.close()
+# Above SCATTER_POINT_LIMIT respondents the care load vs age scatter is drawn
+# from a 2-D histogram instead of raw points: one point per occupied cell per
+# work mode, sized by respondent count and coloured by mean burnout risk, so
+# the chart payload is bounded by the bin grid rather than by row count.
+SCATTER_POINT_LIMIT = 5000
+SCATTER_BINS = 40
+
+def bin_care_load_vs_age(df, bins=SCATTER_BINS):
+    valid = df.dropna(subset=["total_care_load", "age", "burnout_risk"])
+    columns = ["work_mode", "total_care_load", "age", "burnout_risk", "respondents"]
+    if valid.empty:
+        return pd.DataFrame(columns=columns)
+
+    care = valid["total_care_load"].to_numpy(dtype=float)
+    age = valid["age"].to_numpy(dtype=float)
+    care_edges = np.linspace(care.min(), care.max(), bins + 1)
+    age_edges = np.linspace(age.min(), age.max(), bins + 1)
+    care_bin = np.clip(np.searchsorted(care_edges, care, side="right") - 1, 0, bins - 1)
+    age_bin = np.clip(np.searchsorted(age_edges, age, side="right") - 1, 0, bins - 1)
+
+    cells = pd.DataFrame({
+        "work_mode": valid["work_mode"].to_numpy(),
+        "care_bin": care_bin,
+        "age_bin": age_bin,
+        "burnout_risk": valid["burnout_risk"].to_numpy(dtype=float),
+    })
+    binned = cells.groupby(["work_mode", "care_bin", "age_bin"], observed=True).agg(
+        burnout_risk=("burnout_risk", "mean"),
+        respondents=("burnout_risk", "size"),
+    ).reset_index()
+    # Plot each cell at its centre
+    binned["total_care_load"] = (care_edges[binned["care_bin"]] + care_edges[binned["care_bin"] + 1]) / 2
+    binned["age"] = (age_edges[binned["age_bin"]] + age_edges[binned["age_bin"] + 1]) / 2
+    return binned[columns]
 
 # =============================
-# 5. INSIGHT 4: ENGAGEMENT TRADE-OFF
+# 4. SUMMARY TABLE
 # =============================
-engagement_by_mode = df.groupby("work_mode")["engagement_score"].mean()
+def get_summary(df=None):
+    cube = get_cube() if df is None else build_cube(df)
+    return cube_aggregate(cube, "work_mode").round(2)
 
-plt.figure()
-engagement_by_mode.plot(kind="bar")
-plt.title("Employee Engagement by Work Mode (2020)")
-plt.xlabel("Work Mode")
-plt.ylabel("Engagement Score")
-plt.tight_layout()
-plt.savefig(f"{OUTPUT_DIR}/engagement_by_work_mode.png", dpi=300)
-plt.close()
+def get_summary_ci(df=None, metrics=CUBE_METRICS, replicates=DEFAULT_REPLICATES, confidence=0.95):
+    # Bootstrap CI of each metric's mean per work mode; columns are (metric, stat).
+    # The metrics are resampled together: one draw of respondents per replicate.
+    df = _cached_dataframe() if df is None else df
+    with stage("bootstrap", rows=len(df)):
+        table = bootstrap_means(df[list(metrics)], df["work_mode"], replicates, confidence)
+    return table.round(2)
 
 # =============================
-# 6. SUMMARY TABLE
+# 5. STATIC CHARTS
 # =============================
-def get_summary():
-    summary = df.groupby("work_mode").agg({
-        "morale_score": "mean",
-        "engagement_score": "mean",
-        "burnout_risk": "mean",
-        "total_care_load": "mean"
-    }).round(2)
-    return summary
+# Draw functions run in chart worker processes (see charts.py), so they
+# import pyplot themselves and receive only the aggregate they plot.
+def _draw_series(series, title, xlabel, ylabel, **plot_kwargs):
+    import matplotlib.pyplot as plt
+    series.plot(**plot_kwargs)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.tight_layout()
+
+def _draw_care_load_vs_age(points, title, xlabel, ylabel, binned=False):
+    import matplotlib.pyplot as plt
+    if binned:
+        # Hexbin keeps render time and file size flat for large exports
+        plt.hexbin(points["total_care_load"], points["age"], C=points["burnout_risk"],
+                   reduce_C_function=np.mean, gridsize=SCATTER_BINS, cmap='viridis')
+    else:
+        plt.scatter(points["total_care_load"], points["age"], c=points["burnout_risk"], cmap='viridis')
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.colorbar(label='Burnout Risk')
+    plt.tight_layout()
+
+def chart_specs(df):
+    return [
+        # INSIGHT 1: MORALE BY WORK MODE
+        chart_spec(
+            "morale_by_work_mode.png", _draw_series,
+            df.groupby("work_mode", observed=True)["morale_score"].mean(),
+            kind="bar", title="Average Morale by Work Mode (2020)",
+            xlabel="Work Mode", ylabel="Average Morale Score", dpi=300,
+        ),
+        # INSIGHT 2: ORG SUPPORT → JOB SATISFACTION
+        chart_spec(
+            "org_preparedness_vs_morale.png", _draw_series,
+            df.groupby("org_preparedness_last_year")["morale_score"].mean(),
+            marker="o", title="Organisational Preparedness vs Job Satisfaction (2020)",
+            xlabel="Org Preparedness Score", ylabel="Average Morale Score", dpi=300,
+        ),
+        # INSIGHT 3: STRESS & BURNOUT RISK
+        chart_spec(
+            "care_load_vs_age.png", _draw_care_load_vs_age,
+            df[["total_care_load", "age", "burnout_risk"]].reset_index(drop=True),
+            binned=len(df) > SCATTER_POINT_LIMIT, title="Care Load vs Age (Burnout Risk Color)",
+            xlabel="Family + Caring Time (hours)", ylabel="Age", dpi=300,
+        ),
+        # INSIGHT 4: ENGAGEMENT TRADE-OFF
+        chart_spec(
+            "engagement_by_work_mode.png", _draw_series,
+            df.groupby("work_mode", observed=True)["engagement_score"].mean(),
+            kind="bar", title="Employee Engagement by Work Mode (2020)",
+            xlabel="Work Mode", ylabel="Engagement Score", dpi=300,
+        ),
+    ]
+
+def render_charts(df=None, output_dir=OUTPUT_DIR, workers=None, force=False):
+    # Only charts whose aggregate or style changed since the last run are
+    # redrawn, unless force is set
+    if df is None:
+        df = _cached_dataframe()
+    return render_chart_specs(chart_specs(df), output_dir, workers=workers, force=force)
+
+if __name__ == "__main__":
+    for path in render_charts():
+        print(f"Rendered {path}")
+    print(get_summary())
@@ -0,0 +1,165 @@
+import os
+import re
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from data_io import dataset_columns, read_dataset
+from decoders import decode_percentage, decode_work_mode_2020, decode_work_mode_pct
+
+# =============================
+# SPARSE MULTI-SELECT MATRIX
+# =============================
+# The barrier and best/worst-aspect questions were asked as repeated
+# "pick the most / least" sets, which the cleaner spreads over dozens of
+# text columns. Each question family is encoded once into a respondent x
+# option CSR matrix holding how many times the respondent picked the option.
+# Prevalence per group and option co-occurrence are then sparse products
+# (group indicator @ matrix, matrix.T @ matrix) instead of row-wise pandas.
+#
+# 2021 also rates each barrier separately (barrier_<name>: "Somewhat
+# improved", ...); those become one option per barrier/answer pair.
+#
+# Counts are stored as uint8 (a family has far fewer than 255 columns).
+# The matrix is not smaller than the categorical columns it replaces: CSR
+# needs an int32 column index per pick. The gain is that group and pair
+# counts are single sparse products.
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+
+MULTISELECT_FAMILIES = [
+    ("most_barrier", re.compile(r"^(most_barrier_|barrier_most_)")),
+    ("least_barrier", re.compile(r"^(least_barrier_|barrier_least_)")),
+    ("best_aspect", re.compile(r"^(best_aspect_|best_remote_)")),
+    ("worst_aspect", re.compile(r"^(worst_aspect_|worst_remote_)")),
+    ("barrier_change", re.compile(r"^barrier_(?!most_|least_)")),
+]
+# Families where the column itself names the option (rated per column)
+RATED_FAMILIES = {"barrier_change"}
+
+def family_columns(columns):
+    families = {}
+    for col in columns:
+        for family, pattern in MULTISELECT_FAMILIES:
+            if pattern.match(col):
+                families.setdefault(family, []).append(col)
+                break
+    return families
+
+def encode_family(df, columns, rated=False):
+    # Returns (CSR count matrix, option labels)
+    options = {}
+    rows, cols = [], []
+    for col in columns:
+        values = df[col]
+        if rated:
+            values = col + ": " + values.astype("string")
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([options.setdefault(option, len(options)) for option in uniques], dtype=np.int64)
+        answered = codes >= 0
+        rows.append(np.flatnonzero(answered))
+        cols.append(lookup[codes[answered]])
+    rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.array([], dtype=np.int64)
+    # Duplicate (row, option) pairs are summed when converting to CSR; a
+    # count can be at most the number of columns
+    count_dtype = np.min_scalar_type(max(len(columns), 1))
+    matrix = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=count_dtype), (rows, cols)), shape=(len(df), len(options))
+    ).tocsr()
+    return matrix, list(options)
+
+def encode_multiselect(df, families=None):
+    # family -> {"matrix": CSR counts, "options": labels, "columns": source columns}
+    families = families or family_columns(df.columns)
+    return {
+        family: dict(zip(("matrix", "options"), encode_family(df, columns, family in RATED_FAMILIES)),
+                     columns=columns)
+        for family, columns in families.items()
+    }
+
+def _indicator(matrix):
+    # Picked at least once, as int32 so products over respondents cannot
+    # overflow the narrow count type
+    picked = matrix.astype(np.int32)
+    picked.data = (picked.data > 0).astype(np.int32)
+    picked.eliminate_zeros()
+    return picked
+
+def prevalence_by_group(matrix, options, groups):
+    # % of each group's respondents who picked each option at least once
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    valid = codes >= 0
+    membership = sparse.csr_matrix(
+        (np.ones(valid.sum(), dtype=np.int32), (codes[valid], np.flatnonzero(valid))),
+        shape=(len(labels), matrix.shape[0]),
+    )
+    counts = (membership @ _indicator(matrix)).toarray()
+    sizes = np.asarray(membership.sum(axis=1)).ravel()
+    shares = counts / np.where(sizes == 0, np.nan, sizes)[:, None] * 100
+    return pd.DataFrame(shares, index=pd.Index(labels, name=getattr(groups, "name", None)), columns=options)
+
+def cooccurrence(matrix, options):
+    # Respondents who picked both options (diagonal: picked the option)
+    picked = _indicator(matrix)
+    both = (picked.T @ picked).toarray()
+    return pd.DataFrame(both, index=options, columns=options)
+
+def sparse_nbytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+# =============================
+# SURVEY LOADING
+# =============================
+WORK_MODE_SOURCES = {2020: "remote_time_last_year", 2021: "how_much_of_your_work"}
+
+def work_mode_for(df, year):
+    # Same work-mode definitions as morale.py (2020) and member2 (2021)
+    source = df[WORK_MODE_SOURCES[year]]
+    if year == 2020:
+        return decode_work_mode_2020(source).where(source.notna())
+    return decode_work_mode_pct(decode_percentage(source, year))
+
+def load_multiselect(csv_path, year):
+    columns = dataset_columns(csv_path)
+    families = family_columns(columns)
+    needed = [WORK_MODE_SOURCES[year]] + [col for cols in families.values() for col in cols]
+    df = read_dataset(csv_path, columns=needed, compact=True)
+    return encode_multiselect(df, families), work_mode_for(df, year).rename("work_mode"), df
+
+# =============================
+# COMMAND LINE
+# =============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrier / aspect prevalence by work mode.")
+    parser.add_argument("year", type=int, choices=sorted(WORK_MODE_SOURCES))
+    parser.add_argument("--family", help="only this question family")
+    parser.add_argument("--top", type=int, default=5, help="options shown per family")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--pairs", action="store_true",
+                        help="also list the option pairs most often picked by the same respondent")
+    args = parser.parse_args(argv)
+
+    csv_path = os.path.join(args.data_dir, f"{args.year}_cleaned_data.csv")
+    encoded, work_mode, df = load_multiselect(csv_path, args.year)
+    for family, entry in encoded.items():
+        if args.family and family != args.family:
+            continue
+        # Against the columns as loaded (categoricals), not object strings
+        wide_bytes = df[entry["columns"]].memory_usage(deep=True, index=False).sum()
+        print(f"\n=== {family}: {len(entry['columns'])} columns -> {len(entry['options'])} options "
+              f"({wide_bytes / 1e3:.0f} KB categorical -> {sparse_nbytes(entry['matrix']) / 1e3:.0f} KB sparse) ===")
+        shares = prevalence_by_group(entry["matrix"], entry["options"], work_mode)
+        top = shares.mean().sort_values(ascending=False).index[:args.top]
+        print(shares[top].T.round(1).to_string())
+        if args.pairs:
+            both = cooccurrence(entry["matrix"], entry["options"])
+            # Upper triangle only: each unordered pair once, no diagonal
+            pairs = both.where(np.triu(np.ones(both.shape, dtype=bool), k=1)).stack()
+            print("\nPicked together (respondents):")
+            print(pairs.sort_values(ascending=False).head(args.top).astype(int).to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
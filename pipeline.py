@@ -0,0 +1,165 @@
+import os
+import ast
+import sys
+import argparse
+import subprocess
+from manifest import file_digest, is_up_to_date, record_build
+from instrumentation import PROFILE_DIR_ENV, stage as profile, write_reports
+
+# =============================
+# DEPENDENCY GRAPH
+# =============================
+# Each stage lists the files it reads (data and code) and the files it writes.
+# Code inputs are the stage's entry script plus every repo module it imports,
+# found by following imports, so a change to a shared helper reruns its stages.
+# A stage only reruns when one of its inputs changed or an output is missing
+# or was modified since it was built. Cleaning stages also rely on
+# clean_file's own manifest, so unchanged raw exports stay a no-op.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(BASE_DIR, ".build_manifest.json")
+
+def _path(*parts):
+    return os.path.join(BASE_DIR, *parts)
+
+def _imported_names(tree):
+    # Module-level and function-level (lazy) imports alike
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module
+
+def code_inputs(*parts):
+    # The script plus the repo modules it imports, directly or transitively.
+    # Modules resolve next to the importing file first (member2/), then in the
+    # repo root; anything else is a third-party or standard-library module.
+    pending = [_path(*parts)]
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for name in _imported_names(tree):
+            for directory in (os.path.dirname(path), BASE_DIR):
+                module = os.path.join(directory, name.split(".")[0] + ".py")
+                if os.path.exists(module):
+                    pending.append(module)
+                    break
+    return sorted(found)
+
+# Stage runners take `force` so --force also bypasses the cleaner's own
+# manifest and the chart hash cache, not just this pipeline's manifest
+def _clean(year, force):
+    from clean_data import clean_file
+    clean_file(_path("datasets", f"{year}_rws.csv"), _path("datasets", f"{year}_cleaned_data.csv"), force=force)
+
+def _harmonise(force):
+    from clean_data import build_harmonised
+    build_harmonised(_path("datasets"), force=force)
+
+def _render_morale_charts(force):
+    from morale import render_charts
+    render_charts(force=force)
+
+def _run_script(*parts, force=False):
+    env = dict(os.environ, MPLBACKEND="Agg")
+    command = [sys.executable, _path(*parts)] + (["--force"] if force else [])
+    subprocess.run(command, cwd=BASE_DIR, env=env, check=True)
+
+STAGES = [
+    {
+        "name": "clean_2021",
+        "inputs": [_path("datasets", "2021_rws.csv")] + code_inputs("clean_data.py"),
+        "outputs": [_path("datasets", "2021_cleaned_data.csv")],
+        "run": lambda force: _clean(2021, force),
+    },
+    {
+        "name": "clean_2020",
+        "inputs": [_path("datasets", "2020_rws.csv")] + code_inputs("clean_data.py"),
+        "outputs": [_path("datasets", "2020_cleaned_data.csv")],
+        "run": lambda force: _clean(2020, force),
+    },
+    {
+        "name": "harmonise",
+        "inputs": [
+            _path("datasets", "2020_cleaned_data.csv"),
+            _path("datasets", "2021_cleaned_data.csv"),
+        ] + code_inputs("clean_data.py"),
+        "outputs": [_path("datasets", "harmonised_data.csv")],
+        "run": _harmonise,
+    },
+    {
+        "name": "morale_charts",
+        "inputs": [_path("datasets", "2020_cleaned_data.csv")] + code_inputs("morale.py"),
+        "outputs": [
+            _path("charts_2020", "morale_by_work_mode.png"),
+            _path("charts_2020", "org_preparedness_vs_morale.png"),
+            _path("charts_2020", "care_load_vs_age.png"),
+            _path("charts_2020", "engagement_by_work_mode.png"),
+        ],
+        "run": _render_morale_charts,
+    },
+    {
+        "name": "member2_productivity",
+        "inputs": [_path("datasets", "2021_cleaned_data.csv")] + code_inputs("member2", "analyze_member2.py"),
+        "outputs": [
+            _path("member2", "analysis_summary.txt"),
+            _path("member2", "productivity_by_mode.png"),
+            _path("member2", "productivity_distribution.png"),
+        ],
+        "run": lambda force: _run_script("member2", "analyze_member2.py", force=force),
+    },
+    {
+        "name": "member2_comparative",
+        "inputs": [_path("datasets", "harmonised_data.csv")] + code_inputs("member2", "comparative_analysis.py"),
+        "outputs": [
+            _path("member2", "comparative_analysis_summary.txt"),
+            _path("member2", "comparison_productivity_avg.png"),
+            _path("member2", "comparison_productivity_dist.png"),
+        ],
+        "run": lambda force: _run_script("member2", "comparative_analysis.py", force=force),
+    },
+]
+
+def stage_fingerprint(stage):
+    return {os.path.relpath(path, BASE_DIR): file_digest(path) for path in stage["inputs"]}
+
+def run_pipeline(only=None, force=False):
+    # Stages are listed in dependency order, so a single pass is enough
+    for stage in STAGES:
+        if only and stage["name"] not in only:
+            continue
+        fingerprint = stage_fingerprint(stage)
+        if not force and is_up_to_date(MANIFEST_PATH, stage["name"], fingerprint, stage["outputs"]):
+            print(f"[{stage['name']}] up to date")
+            continue
+        print(f"[{stage['name']}] running...")
+        with profile(f"pipeline:{stage['name']}"):
+            stage["run"](force)
+        record_build(MANIFEST_PATH, stage["name"], fingerprint, stage["outputs"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild cleaned data, charts and summaries that are out of date.")
+    parser.add_argument("stages", nargs="*", help="only run these stages (default: all)")
+    parser.add_argument("--force", action="store_true", help="rerun stages even if up to date, including re-cleaning and redrawing every chart")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="record per-stage timings/memory to DIR and write report.json + trace.json")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.stages) - {stage["name"] for stage in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    if args.profile:
+        # Set in the environment so worker processes and member2 scripts record too
+        os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.profile)
+    run_pipeline(only=args.stages, force=args.force)
+    if args.profile:
+        write_reports(os.environ[PROFILE_DIR_ENV])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from clean_data import dataset_year_of
+from decoders import decode_percentage, decode_productivity, decode_work_mode_pct
+
+# =============================
+# ONLINE PRODUCTIVITY STATISTICS
+# =============================
+# Count, mean, variance (Welford / Chan's parallel update), % reporting
+# higher productivity and a prod_score histogram per year x work_mode,
+# accumulated chunk by chunk. The state is a plain JSON-serialisable dict,
+# so a summary over an export larger than RAM only ever holds one chunk, and
+# a saved state can be topped up with new responses instead of recomputed.
+
+GROUP_KEYS = ["year", "work_mode"]
+# Scores are -50..+50 in steps of 10: one bin per answer
+PRODUCTIVITY_BIN_EDGES = list(range(-55, 60, 10))
+
+# Column holding the share of remote time, per source layout
+REMOTE_TIME_COLUMNS = {"2020": "remote_time_last_3m", "2021": "how_much_of_your_work"}
+HARMONISED_REMOTE_TIME = "remote_time_current"
+PRODUCTIVITY_COLUMN = "relative_remote_productivity"
+
+def new_state(bin_edges=PRODUCTIVITY_BIN_EDGES):
+    return {"bin_edges": list(bin_edges), "groups": {}}
+
+def _empty_group(year, work_mode, bins):
+    return {"year": year, "work_mode": work_mode, "count": 0, "mean": 0.0, "m2": 0.0,
+            "more_productive": 0, "histogram": [0] * bins}
+
+def _combine(a, b):
+    # Chan et al. pairwise update of count/mean/M2; exact copy when a is empty
+    if a["count"] == 0:
+        return dict(b, histogram=list(b["histogram"]))
+    if b["count"] == 0:
+        return dict(a, histogram=list(a["histogram"]))
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    return dict(
+        a,
+        count=count,
+        mean=a["mean"] + delta * b["count"] / count,
+        m2=a["m2"] + b["m2"] + delta ** 2 * a["count"] * b["count"] / count,
+        more_productive=a["more_productive"] + b["more_productive"],
+        histogram=[x + y for x, y in zip(a["histogram"], b["histogram"])],
+    )
+
+def _group_key(year, work_mode):
+    return f"{year}|{work_mode}"
+
+def update_state(state, frame):
+    # frame: year, work_mode and prod_score columns; rows missing either
+    # the work mode or the score are ignored
+    frame = frame.dropna(subset=["work_mode", "prod_score"])
+    if frame.empty:
+        return state
+    edges = np.asarray(state["bin_edges"], dtype=float)
+    bins = len(edges) - 1
+    scores = frame["prod_score"].astype(float)
+    bin_index = np.clip(np.searchsorted(edges, scores.to_numpy(), side="right") - 1, 0, bins - 1)
+
+    chunk = pd.DataFrame({
+        "year": frame["year"].astype(str).to_numpy(),
+        "work_mode": frame["work_mode"].astype(str).to_numpy(),
+        "prod_score": scores.to_numpy(),
+        "more_productive": (scores > 0).to_numpy(),
+        "bin": bin_index,
+    })
+    grouped = chunk.groupby(GROUP_KEYS)
+    stats = grouped["prod_score"].agg(["count", "mean", "var"])
+    more = grouped["more_productive"].sum()
+    histograms = chunk.groupby(GROUP_KEYS + ["bin"]).size()
+
+    for (year, work_mode), row in stats.iterrows():
+        count = int(row["count"])
+        histogram = np.zeros(bins, dtype=int)
+        group_bins = histograms.loc[(year, work_mode)]
+        histogram[group_bins.index.to_numpy()] = group_bins.to_numpy()
+        batch = {
+            "year": year, "work_mode": work_mode, "count": count, "mean": float(row["mean"]),
+            "m2": float(row["var"]) * (count - 1) if count > 1 else 0.0,
+            "more_productive": int(more.loc[(year, work_mode)]),
+            "histogram": histogram.tolist(),
+        }
+        key = _group_key(year, work_mode)
+        current = state["groups"].get(key, _empty_group(year, work_mode, bins))
+        state["groups"][key] = _combine(current, batch)
+    return state
+
+def merge_states(a, b):
+    if a["bin_edges"] != b["bin_edges"]:
+        raise ValueError("Cannot merge productivity states with different histogram bins")
+    merged = new_state(a["bin_edges"])
+    for state in (a, b):
+        for key, group in state["groups"].items():
+            current = merged["groups"].get(key, _empty_group(group["year"], group["work_mode"], len(group["histogram"])))
+            merged["groups"][key] = _combine(current, group)
+    return merged
+
+def state_table(state, by=GROUP_KEYS):
+    # Per-group count, mean, sample std and % more productive; groups are
+    # pooled when `by` is coarser than year x work_mode
+    by = [by] if isinstance(by, str) else list(by)
+    pooled = {}
+    for group in state["groups"].values():
+        key = tuple(group[k] for k in by)
+        current = pooled.get(key, _empty_group(group["year"], group["work_mode"], len(group["histogram"])))
+        pooled[key] = _combine(current, group)
+
+    rows = []
+    for key, group in sorted(pooled.items()):
+        count = group["count"]
+        rows.append(dict(
+            zip(by, key),
+            count=count,
+            mean=group["mean"],
+            std=(group["m2"] / (count - 1)) ** 0.5 if count > 1 else np.nan,
+            pct_more_productive=group["more_productive"] / count * 100,
+        ))
+    columns = by + ["count", "mean", "std", "pct_more_productive"]
+    return pd.DataFrame(rows, columns=columns).set_index(by)
+
+def state_histogram(state):
+    # Rows: year x work_mode, columns: bin centres
+    edges = state["bin_edges"]
+    centres = [(lo + hi) / 2 for lo, hi in zip(edges[:-1], edges[1:])]
+    groups = sorted(state["groups"].values(), key=lambda g: (g["year"], g["work_mode"]))
+    index = pd.MultiIndex.from_tuples([(g["year"], g["work_mode"]) for g in groups], names=GROUP_KEYS)
+    return pd.DataFrame([g["histogram"] for g in groups], index=index, columns=centres)
+
+def save_state(state, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_state(path):
+    with open(path) as f:
+        return json.load(f)
+
+# =============================
+# CHUNKED SOURCES
+# =============================
+def decode_responses(df, remote_column):
+    # Same decoding as the member2 scripts: remote share -> work mode, answer -> score
+    years = df["year"].astype(str)
+    remote_pct = pd.concat([
+        decode_percentage(group[remote_column], year)
+        for year, group in df.groupby(years)
+    ]) if len(df) else pd.Series(dtype=float)
+    return pd.DataFrame({
+        "year": years,
+        "work_mode": decode_work_mode_pct(remote_pct.reindex(df.index)),
+        "prod_score": decode_productivity(df[PRODUCTIVITY_COLUMN]),
+    })
+
+def iter_response_chunks(csv_path, chunksize=100000):
+    # Cleaned per-year files and the harmonised table (which has a year column)
+    header = pd.read_csv(csv_path, nrows=0).columns
+    if "year" in header:
+        remote_column = HARMONISED_REMOTE_TIME
+        columns = ["year", remote_column, PRODUCTIVITY_COLUMN]
+        year = None
+    else:
+        year = str(dataset_year_of(csv_path))
+        remote_column = REMOTE_TIME_COLUMNS[year]
+        columns = [remote_column, PRODUCTIVITY_COLUMN]
+    for chunk in pd.read_csv(csv_path, usecols=columns, dtype=str, chunksize=chunksize):
+        if year is not None:
+            chunk["year"] = year
+        yield decode_responses(chunk, remote_column)
+
+def aggregate_files(paths, chunksize=100000, state=None):
+    state = state if state is not None else new_state()
+    for path in paths:
+        for chunk in iter_response_chunks(path, chunksize):
+            update_state(state, chunk)
+    return state
+
+# =============================
+# COMMAND LINE
+# =============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream productivity statistics per year and work mode.")
+    parser.add_argument("paths", nargs="*", help="cleaned survey CSVs or the harmonised table")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--state", help="JSON state to update in place (created if missing); "
+                                        "only pass responses it has not seen yet")
+    parser.add_argument("--merge", nargs="+", default=[], metavar="STATE",
+                        help="states saved by other runs (e.g. one per shard of an export) to fold in")
+    parser.add_argument("--histogram", action="store_true",
+                        help="also print the prod_score histogram per year and work mode")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.merge:
+        parser.error("give cleaned CSVs to read and/or --merge states")
+
+    state = load_state(args.state) if args.state and os.path.exists(args.state) else None
+    state = aggregate_files(args.paths, args.chunksize, state)
+    for path in args.merge:
+        state = merge_states(state, load_state(path))
+    if args.state:
+        save_state(state, args.state)
+    print(state_table(state).round(2).to_string())
+    if args.histogram:
+        print("\n--- prod_score histogram (bin centres) ---")
+        print(state_histogram(state).to_string())
+
+if __name__ == "__main__":
+    main()
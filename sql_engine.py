@@ -0,0 +1,166 @@
+import os
+import sys
+import argparse
+from data_io import columnar_is_fresh, columnar_path
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+# =============================
+# EMBEDDED SQL ENGINE (OPTIONAL)
+# =============================
+# Registers the cleaned datasets in an in-process DuckDB database so ad-hoc
+# group-bys are one SQL query instead of another pandas script. Views read
+# the Parquet twins when fresh (falling back to the CSVs), so DuckDB only
+# scans the columns and row groups a query touches, on all cores.
+#
+#   survey_2020, survey_2021, harmonised   cleaned tables as written
+#   morale_2020    survey_2020 + work_mode, Likert scores, morale_score,
+#                  total_care_load, burnout_risk, engagement_score
+#                  (same rows and formulas as morale.get_dataframe)
+#   productivity   harmonised + remote_pct, prod_score, work_mode
+#                  (same decoding as the member2 analyses)
+#
+# The CASE expressions below mirror decoders.py and morale.py; keep them in
+# step when those change.
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+SOURCES = {
+    "survey_2020": "2020_cleaned_data.csv",
+    "survey_2021": "2021_cleaned_data.csv",
+    "harmonised": "harmonised_data.csv",
+}
+
+LIKERT_SCORES = {
+    "Strongly agree": 5,
+    "Somewhat agree": 4,
+    "Neither agree nor disagree": 3,
+    "Somewhat disagree": 2,
+    "Strongly disagree": 1,
+}
+PERCENT_STEPS = [100, 90, 80, 70, 60, 50, 40, 30, 20, 10]
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _likert(column):
+    cases = " ".join(f"WHEN {_quote(answer)} THEN {score}" for answer, score in LIKERT_SCORES.items())
+    return f"CASE {column} {cases} END"
+
+def _work_mode_2020(column):
+    text = f"lower(CAST({column} AS VARCHAR))"
+    return f"""CASE
+        WHEN {text} LIKE '%less than%' OR {text} LIKE '%10\\%%' ESCAPE '\\' OR {text} LIKE '%rarely%' THEN 'Mostly onsite'
+        WHEN {text} LIKE '%half%' OR {text} LIKE '%50\\%%' ESCAPE '\\' THEN 'Hybrid'
+        ELSE 'Mostly remote' END"""
+
+def _percentage(column, year_expr):
+    # decoders.parse_percentage_2020 / _2021: first listed step found wins
+    text = f"lower(CAST({column} AS VARCHAR))"
+    steps = " ".join(f"WHEN {text} LIKE '%{step}\\%%' ESCAPE '\\' THEN {step}" for step in PERCENT_STEPS)
+    return f"""CASE
+        WHEN {column} IS NULL THEN NULL
+        WHEN {year_expr} = 2020 AND {text} LIKE '%rarely or never%' THEN 0
+        {steps}
+        ELSE NULL END"""
+
+def _productivity(column):
+    text = f"lower(CAST({column} AS VARCHAR))"
+    number = f"TRY_CAST(regexp_extract({text}, '(\\d+)%', 1) AS INTEGER)"
+    return f"""CASE
+        WHEN {text} LIKE '%about same%' THEN 0
+        WHEN {text} LIKE '%more productive%' THEN {number}
+        WHEN {text} LIKE '%less productive%' THEN -{number}
+        ELSE NULL END"""
+
+def _work_mode_pct(column):
+    return f"""CASE
+        WHEN {column} IS NULL THEN NULL
+        WHEN {column} >= 80 THEN 'Remote'
+        WHEN {column} <= 20 THEN 'On-site'
+        ELSE 'Hybrid' END"""
+
+def _source_scan(csv_path):
+    if columnar_is_fresh(csv_path):
+        return f"read_parquet({_quote(columnar_path(csv_path))})"
+    return f"read_csv_auto({_quote(csv_path)}, header = true)"
+
+def _derived_views():
+    return {
+        "morale_2020": f"""
+            WITH scored AS (
+                SELECT * REPLACE (
+                    {_likert('org_encouragement_last_year')} AS org_encouragement_last_year,
+                    {_likert('org_preparedness_last_year')} AS org_preparedness_last_year
+                )
+                FROM survey_2020
+            ), features AS (
+                SELECT *,
+                    {_work_mode_2020('remote_time_last_year')} AS work_mode,
+                    (org_encouragement_last_year + org_preparedness_last_year) / 2.0 AS morale_score,
+                    CAST(office_family_hours AS DOUBLE) + CAST(office_domestic_hours AS DOUBLE) AS total_care_load
+                FROM scored
+                WHERE remote_time_last_year IS NOT NULL
+                  AND org_encouragement_last_year IS NOT NULL
+                  AND org_preparedness_last_year IS NOT NULL
+            )
+            SELECT *,
+                total_care_load / (total_care_load + CAST(office_commute_hours AS DOUBLE) + 1) AS burnout_risk,
+                morale_score AS engagement_score
+            FROM features""",
+        "productivity": f"""
+            WITH decoded AS (
+                SELECT *,
+                    {_percentage('remote_time_current', 'year')} AS remote_pct,
+                    {_productivity('relative_remote_productivity')} AS prod_score
+                FROM harmonised
+            )
+            SELECT *, {_work_mode_pct('remote_pct')} AS work_mode
+            FROM decoded""",
+    }
+
+def connect(data_dir=DEFAULT_DATA_DIR, database=":memory:", threads=None):
+    if duckdb is None:
+        raise ImportError("The SQL engine needs the optional duckdb package: pip install duckdb")
+    con = duckdb.connect(database)
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    for view, filename in SOURCES.items():
+        csv_path = os.path.join(data_dir, filename)
+        if os.path.exists(csv_path) or columnar_is_fresh(csv_path):
+            con.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {_source_scan(csv_path)}")
+    registered = {row[0] for row in con.execute("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
+    for view, sql in _derived_views().items():
+        if view == "morale_2020" and "survey_2020" not in registered:
+            continue
+        if view == "productivity" and "harmonised" not in registered:
+            continue
+        con.execute(f"CREATE OR REPLACE VIEW {view} AS {sql}")
+    return con
+
+def query(sql, con=None, data_dir=DEFAULT_DATA_DIR):
+    # Returns a pandas DataFrame
+    con = con or connect(data_dir)
+    return con.execute(sql).df()
+
+# =============================
+# COMMAND LINE
+# =============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SQL over the cleaned survey datasets.")
+    parser.add_argument("sql", help="e.g. \"SELECT industry, avg(prod_score) FROM productivity GROUP BY 1\"")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        con = connect(args.data_dir, threads=args.threads)
+    except ImportError as e:
+        print(e)
+        return 1
+    print(con.execute(args.sql).df().to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
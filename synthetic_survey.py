@@ -0,0 +1,108 @@
+import os
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+from clean_data import dataset_year_of, detect_encoding, rename_columns
+
+# =============================
+# SYNTHETIC SURVEY EXPORTS
+# =============================
+# Learns the answer distribution of every column in a raw NSW survey export
+# and writes arbitrarily large exports with the same headers and encoding,
+# one chunk at a time. Columns are sampled independently except for the
+# pairs in CONDITIONAL_COLUMNS, where the child answer is drawn from its
+# distribution given the parent answer so the key relationship survives.
+
+# child -> parent, keyed by the cleaned column names
+CONDITIONAL_COLUMNS = {
+    2020: {"relative_remote_productivity": "remote_time_last_year"},
+    2021: {"relative_remote_productivity": "how_much_of_your_work"},
+}
+ID_COLUMN = "response_id"
+DEFAULT_CHUNK_ROWS = 100000
+
+def _distribution(values):
+    counts = values.value_counts(sort=False)
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+def learn_model(raw_file):
+    encoding = detect_encoding(raw_file)
+    with open(raw_file, encoding=encoding, newline="") as f:
+        headers = next(csv.reader(f))
+    raw = pd.read_csv(raw_file, encoding=encoding, dtype=str, keep_default_na=False)
+    raw.columns = range(len(headers))
+    names = rename_columns(headers, raw_file)
+    position = {name: i for i, name in enumerate(names)}
+
+    conditionals = {}
+    for child, parent in CONDITIONAL_COLUMNS.get(dataset_year_of(raw_file), {}).items():
+        if child in position and parent in position:
+            grouped = raw.groupby(position[parent])[position[child]]
+            conditionals[position[child]] = (
+                position[parent],
+                {answer: _distribution(group) for answer, group in grouped},
+            )
+
+    return {
+        "headers": headers,
+        "encoding": encoding,
+        "id_column": position.get(ID_COLUMN),
+        "columns": [_distribution(raw[i]) for i in range(len(headers))],
+        "conditionals": conditionals,
+    }
+
+def sample_chunk(model, rows, rng, first_id=1):
+    data = {}
+    for i, (values, probs) in enumerate(model["columns"]):
+        if i == model["id_column"] or i in model["conditionals"]:
+            continue
+        data[i] = rng.choice(values, size=rows, p=probs)
+
+    for child, (parent, by_answer) in model["conditionals"].items():
+        column = np.empty(rows, dtype=object)
+        for answer, (values, probs) in by_answer.items():
+            mask = data[parent] == answer
+            column[mask] = rng.choice(values, size=int(mask.sum()), p=probs)
+        data[child] = column
+
+    if model["id_column"] is not None:
+        data[model["id_column"]] = np.arange(first_id, first_id + rows)
+
+    return pd.DataFrame({i: data[i] for i in range(len(model["headers"]))})
+
+def generate(raw_file, output_file, rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=0):
+    model = learn_model(raw_file)
+    rng = np.random.default_rng(seed)
+
+    out_dir = os.path.dirname(output_file)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(output_file, "w", encoding=model["encoding"], newline="") as f:
+        csv.writer(f).writerow(model["headers"])
+        written = 0
+        while written < rows:
+            size = min(chunk_rows, rows - written)
+            sample_chunk(model, size, rng, first_id=written + 1).to_csv(f, header=False, index=False)
+            written += size
+    return output_file
+
+# =============================
+# COMMAND LINE
+# =============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate large synthetic raw survey exports.")
+    parser.add_argument("year", choices=["2020", "2021"], help="survey export to learn from")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--output", help="default: synthetic/<year>_synthetic_rws.csv")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    raw_file = os.path.join("datasets", f"{args.year}_rws.csv")
+    output_file = args.output or os.path.join("synthetic", f"{args.year}_synthetic_rws.csv")
+    generate(raw_file, output_file, args.rows, args.chunk_rows, args.seed)
+    print(f"Wrote {args.rows} synthetic responses to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api
+from bootstrap import bootstrap_means
+from productivity_stats import new_state
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), api.ApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def get_json(url):
+    with urlopen(url, timeout=60) as response:
+        return response.status, json.loads(response.read())
+
+def test_bootstrap_means_empty_is_indexed_by_group_names():
+    values = pd.Series([], dtype=float, name="prod_score")
+    by = [pd.Series([], dtype=str, name="year"), pd.Series([], dtype=str, name="work_mode")]
+    result = bootstrap_means(values, by)
+    assert result.empty
+    assert list(result.index.names) == ["year", "work_mode"]
+
+@pytest.mark.parametrize("query", [
+    "year=1999&ci=1",
+    "by=work_mode&year=1999&ci=1",
+    "year=2021&work_mode=Nowhere&ci=1",
+])
+def test_productivity_ci_with_no_matching_responses(base_url, query):
+    status, body = get_json(f"{base_url}/productivity?{query}")
+    assert status == 200
+    assert body["rows"] == []
+
+def test_productivity_ci_with_matching_responses(base_url):
+    status, body = get_json(f"{base_url}/productivity?year=2021&ci=1")
+    assert status == 200
+    assert body["rows"]
+    assert all(row["ci_low"] <= row["mean"] <= row["ci_high"] for row in body["rows"])
+
+def test_responses_come_from_the_snapshot_they_are_keyed_under():
+    current = api.current_data()
+    assert api.current_data() is current
+    # A different snapshot (as after a reload) must not be answered from,
+    # or cached under, the other one
+    other = dict(current, version="other", responses=current["responses"].iloc[:0], productivity=new_state())
+    query = (("ci", ("1",)),)
+    emptied = json.loads(api.cached_response(other, "/productivity", query))
+    assert emptied == {"version": "other", "rows": []}
+    body = json.loads(api.cached_response(current, "/productivity", query))
+    assert body["version"] == current["version"]
+    assert body["rows"]
+    assert current["version"] != "other"